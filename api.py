@@ -0,0 +1,166 @@
+import hashlib
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, jsonify, request
+
+from models import Venue, Artist, Show, parse_genres
+from pagination import keyset_page, estimate_rows
+from routing import replica_reads
+from queries import (venue_listing, artist_listing, show_listing, upcoming_show_total,
+                     venue_detail, artist_detail, venue_version, artist_version)
+
+#----------------------------------------------------------------------------#
+# JSON API.
+#
+# Read-only mirror of the HTML pages for non-browser clients, built on the
+# same queries. Every response carries an ETag derived from the versions
+# of the rows it was built from, so a client revalidating an unchanged
+# resource gets an empty 304. Detail endpoints check the version with one
+# aggregate query before building the payload at all. ?fields=a,b trims
+# each object to the named keys.
+#
+# There is no Last-Modified: show counters, deletes and the upcoming/past
+# rollover change a response without moving any updated_at.
+#----------------------------------------------------------------------------#
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def _requested_fields():
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()}
+
+
+def _trim(item, fields):
+    if fields is None:
+        return item
+    return {key: value for key, value in item.items() if key in fields}
+
+
+def _jsonable(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    return value
+
+
+def _etag(*parts):
+    # The query string is part of the ETag since fields and cursors change
+    # the representation.
+    digest = hashlib.sha1(repr((request.full_path,) + parts).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _conditional(payload, etag):
+    response = jsonify(_jsonable(payload))
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def _not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _listing(statement, model, item):
+    # Shared body of the venue and artist list endpoints.
+    genre = request.args.get('genre')
+    page = keyset_page(statement(genre), ['id'], cursor=request.args.get('cursor'),
+                       total=None if genre else estimate_rows(model))
+    fields = _requested_fields()
+
+    data = [_trim(item(row), fields) for row in page.items]
+    versions = [(row.id, row.updated_at, row.upcoming_show_count) for row in page.items]
+    payload = {
+        "count": page.total,
+        "estimated": page.estimated,
+        "next_cursor": page.next_cursor,
+        "data": data,
+    }
+    return _conditional(payload, _etag(page.total, versions))
+
+
+def _detail(entity_id, version, detail):
+    # Shared body of the venue and artist detail endpoints.
+    row = version(entity_id)
+    if row is None:
+        abort(404)
+    etag = _etag(tuple(row))
+    if request.if_none_match.contains_weak(etag):
+        return _not_modified(etag)
+
+    payload = _trim(detail(entity_id), _requested_fields())
+    return _conditional(payload, etag)
+
+#----------------------------------------------------------------------------#
+# Endpoints.
+#----------------------------------------------------------------------------#
+
+
+@api.errorhandler(404)
+def not_found_error(error):
+    return jsonify({"error": "not found"}), 404
+
+
+def _summary(row):
+    return {
+        "id": row.id,
+        "name": row.name,
+        "city": row.city,
+        "state": row.state,
+        "genres": parse_genres(row.genres),
+        "image_link": row.image_link,
+        "num_upcoming_shows": row.upcoming_show_count,
+    }
+
+
+@api.route('/venues')
+@replica_reads
+def venues():
+    return _listing(venue_listing, Venue, _summary)
+
+
+@api.route('/venues/<int:venue_id>')
+@replica_reads
+def venue(venue_id):
+    return _detail(venue_id, venue_version, venue_detail)
+
+
+@api.route('/artists')
+@replica_reads
+def artists():
+    return _listing(artist_listing, Artist, _summary)
+
+
+@api.route('/artists/<int:artist_id>')
+@replica_reads
+def artist(artist_id):
+    return _detail(artist_id, artist_version, artist_detail)
+
+
+@api.route('/shows')
+@replica_reads
+def shows():
+    upcoming = request.args.get('upcoming') == '1'
+    page = keyset_page(show_listing(upcoming), ['start_time', 'id'],
+                       cursor=request.args.get('cursor'),
+                       total=upcoming_show_total() if upcoming else estimate_rows(Show))
+    fields = _requested_fields()
+
+    # Shows are never edited in place, so the rows themselves (names and
+    # images included) are the version.
+    data = [_trim(dict(row), fields) for row in page.items]
+    versions = [tuple(row.values()) for row in page.items]
+    payload = {
+        "count": page.total,
+        "estimated": page.estimated,
+        "next_cursor": page.next_cursor,
+        "data": data,
+    }
+    return _conditional(payload, _etag(page.total, versions))
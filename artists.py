@@ -0,0 +1,192 @@
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, \
+    request, url_for
+
+from cache import page_cache, artist_page_keys, invalidate_artist
+from http_cache import cache_control, LISTING, PAGE, FORM
+from models import db, Artist
+from pagination import keyset_page, estimate_rows
+from queries import artist_listing, artist_detail, next_rollover
+from routing import replica_reads
+from search import search_page
+
+#----------------------------------------------------------------------------#
+# Artist pages.
+#
+# Forms are imported in the views that use them, as in venues.py.
+#----------------------------------------------------------------------------#
+
+artists = Blueprint('artists', __name__, url_prefix='/artists')
+
+
+@artists.route('')
+@cache_control(LISTING)
+@replica_reads
+def index():
+    genre = request.args.get('genre')
+    page = keyset_page(
+        artist_listing(genre), ['id'], cursor=request.args.get('cursor'),
+        total=None if genre else estimate_rows(Artist))
+    return render_template('pages/artists.html', artists=page.items, page=page)
+
+
+@artists.route('/search', methods=['POST'])
+@replica_reads
+def search():
+    search_term = request.form.get('search_term', '')
+    page = search_page('artist', search_term, cursor=request.form.get('cursor'))
+    data = []
+    for item in page.items:
+        data.append({
+            "id": item.id,
+            "name": item.name,
+            "num_upcoming_shows": item.num_upcoming_shows
+        })
+
+    response = {
+        "count": page.total,
+        "data": data,
+        "next_cursor": page.next_cursor
+    }
+    return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+
+@artists.route('/<int:artist_id>')
+@cache_control(PAGE)
+@replica_reads
+def show(artist_id):
+    cached = page_cache.get(f"artist:{artist_id}")
+    if cached is not None:
+        return cached
+
+    data = artist_detail(artist_id)
+    if data is None:
+        return render_template("errors/404.html")
+
+    html = render_template('pages/show_artist.html', artist=data)
+    page_cache.set(f"artist:{artist_id}", html, expires_at=next_rollover(data["upcoming_shows"]))
+    return html
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@artists.route('/<int:artist_id>/edit', methods=['GET'])
+@cache_control(FORM)
+def edit_form(artist_id):
+    from forms import ArtistForm
+    artist = Artist.query.get(artist_id)
+
+    if artist is None:
+        return render_template("errors/404.html")
+
+    form = ArtistForm(
+        name=artist.name,
+        city=artist.city,
+        state=artist.state,
+        phone=artist.phone,
+        image_link=artist.image_link,
+        facebook_link=artist.facebook_link,
+        website_link=artist.website_link,
+        seeking_venue=artist.seeking_venue,
+        seeking_description=artist.seeking_description,
+        genres=artist.genre_names
+    )
+
+    return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@artists.route('/<int:artist_id>/edit', methods=['POST'])
+def edit(artist_id):
+    from forms import ArtistForm
+    artist_edit_form = ArtistForm(request.form)
+    artist = Artist.query.get(artist_id)
+    if not artist:
+        return render_template("errors/404.html")
+
+    try:
+        artist.name = artist_edit_form.name.data
+        artist.set_genres(artist_edit_form.genres.data)
+        artist.phone = artist_edit_form.phone.data
+        artist.facebook_link = artist_edit_form.facebook_link.data
+        artist.image_link = artist_edit_form.image_link.data
+        artist.city = artist_edit_form.city.data
+        artist.state = artist_edit_form.state.data
+        artist.website_link = artist_edit_form.website_link.data
+        artist.seeking_venue = artist_edit_form.seeking_venue.data
+        artist.seeking_description = artist_edit_form.seeking_description.data
+
+        db.session.commit()
+        invalidate_artist(artist_id)
+    except:
+        db.session.rollback()
+        current_app.logger.exception("Updating artist %s failed", artist_id)
+        flash("Artist info update unsuccessful")
+    finally:
+        db.session.close()
+
+    flash(f"Successfully updated Artist '{artist_edit_form.name.data}'")
+    return redirect(url_for('artists.show', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+
+@artists.route('/create', methods=['GET'])
+@cache_control(FORM)
+def create_form():
+    from forms import ArtistForm
+    form = ArtistForm()
+    return render_template('forms/new_artist.html', form=form)
+
+
+@artists.route('/create', methods=['POST'])
+def create():
+    from forms import ArtistForm
+    artists_form = ArtistForm(request.form)
+    if artists_form.validate():
+        try:
+            new_artist = Artist(
+                name=artists_form.name.data,
+                city=artists_form.city.data,
+                state=artists_form.state.data,
+                phone=artists_form.phone.data,
+                image_link=artists_form.image_link.data,
+                facebook_link=artists_form.facebook_link.data,
+                website_link=artists_form.website_link.data,
+                seeking_venue=artists_form.seeking_venue.data,
+                seeking_description=artists_form.seeking_description.data
+            )
+            new_artist.set_genres(artists_form.genres.data)
+            db.session.add(new_artist)
+            db.session.commit()
+            flash(f"Artist {request.form['name']} was successfully listed!")
+        except:
+            db.session.rollback()
+            current_app.logger.exception("Creating artist failed")
+            flash(
+                f"An error occurred. Artist {request.form['name']} could not be listed.")
+            return render_template("forms/new_artist.html", form=artists_form)
+        finally:
+            db.session.close()
+    return render_template('pages/home.html')
+
+
+@artists.route('/<artist_id>', methods=['DELETE'])
+def delete(artist_id):
+    artist_to_delete = Artist.query.get(artist_id)
+    if artist_to_delete is None:
+        abort(404)
+
+    try:
+        flash(f"Artist {artist_to_delete.name} was deleted successfully!")
+        stale_pages = artist_page_keys(artist_to_delete.id)
+        db.session.delete(artist_to_delete)
+        db.session.commit()
+        page_cache.delete(*stale_pages)
+    except:
+        db.session.rollback()
+        current_app.logger.exception("Deleting artist %s failed", artist_id)
+    finally:
+        db.session.close()
+
+    return jsonify({"success": True})
@@ -0,0 +1,218 @@
+import asyncio
+import io
+import itertools
+import sys
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+from config import async_database_url, async_engine_options
+from models import db
+from routing import read_bind, replica_router
+
+#----------------------------------------------------------------------------#
+# Async serving mode.
+#
+#   uvicorn asgi:application --workers 4
+#
+# An ASGI entry point for the same Flask app. The read-heavy pages in
+# ASYNC_ENDPOINTS run on the event loop against an asyncio engine (asyncpg,
+# or aiosqlite for SQLite). The views themselves are unchanged: each request
+# is dispatched inside AsyncSession.run_sync() with that session installed as
+# db.session, so every query they issue yields to the loop while the
+# database works, and one worker keeps many requests in flight. Replica
+# routing applies as in the WSGI app.
+#
+# Everything else (forms, deletes, exports, /metrics, static files) is
+# handed to the WSGI app on a thread, as a threaded server would run it.
+#
+# Code on the async path must reach the database only through db.session;
+# anything else that blocks (the redis page cache, for one) blocks the
+# whole worker while it waits.
+#----------------------------------------------------------------------------#
+
+ASYNC_ENDPOINTS = {
+    'venues.index', 'venues.search', 'venues.show',
+    'artists.index', 'artists.search', 'artists.show',
+}
+
+
+class AsyncRoutingSession(Session):
+    # The sync half of each AsyncSession. Routes like RoutingSession, over
+    # the asyncio engines.
+
+    def __init__(self, engines=None, **kwargs):
+        self.engines = engines
+        super().__init__(**kwargs)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        return self.engines.get(read_bind(self, clause), self.engines[None]).sync_engine
+
+
+def build_environ(scope, body):
+    # A WSGI environ for an ASGI HTTP scope, as PEP 3333 lays it out.
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+def _start_message(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers],
+    }
+
+
+def _body_message(chunk, more=True):
+    return {'type': 'http.response.body', 'body': chunk, 'more_body': more}
+
+
+class AsyncApp(object):
+
+    def __init__(self, app):
+        self.app = app
+        options = async_engine_options(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        urls = {None: app.config['SQLALCHEMY_DATABASE_URI']}
+        urls.update((bind, app.config['SQLALCHEMY_BINDS'][bind]) for bind in replica_router.binds)
+        self.engines = {bind: create_async_engine(async_database_url(url), **options)
+                        for bind, url in urls.items()}
+        for bind, engine in self.engines.items():
+            if bind is not None:
+                replica_router.watch(engine.sync_engine, bind)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise RuntimeError(f"Unsupported ASGI scope {scope['type']!r}")
+
+        environ = build_environ(scope, await _read_body(receive))
+        if self._endpoint(environ) in ASYNC_ENDPOINTS:
+            await self._serve_async(environ, send)
+        else:
+            await self._serve_wsgi(environ, send)
+
+    def _endpoint(self, environ):
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+        return endpoint
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for engine in self.engines.values():
+                    await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _dispatch(self, session):
+        # Runs in run_sync()'s greenlet, where the session's blocking calls
+        # are awaited on the loop.
+        db.session.registry.set(session)
+        try:
+            return self.app.full_dispatch_request()
+        finally:
+            db.session.registry.clear()
+
+    async def _serve_async(self, environ, send):
+        # The same steps as Flask.wsgi_app, with the dispatch awaited.
+        ctx = self.app.request_context(environ)
+        error = None
+        try:
+            try:
+                ctx.push()
+                async with AsyncSession(sync_session_class=AsyncRoutingSession,
+                                        engines=self.engines) as session:
+                    response = await session.run_sync(self._dispatch)
+            except Exception as e:
+                error = e
+                response = self.app.handle_exception(e)
+            body, status, headers = response.get_wsgi_response(environ)
+        finally:
+            ctx.pop(error)
+        # What the WSGI middleware does for the threaded path.
+        status, headers, body = self.app.extensions['http_cache'].finish(
+            environ, status, headers, body)
+
+        await send(_start_message(status, headers))
+        try:
+            for chunk in body:
+                await send(_body_message(chunk))
+            await send(_body_message(b'', more=False))
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+    async def _serve_wsgi(self, environ, send):
+        # The whole exchange runs on one thread, so streamed responses
+        # (exports) iterate in the context they were started in.
+        loop = asyncio.get_running_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            started = []
+
+            def start_response(status, headers, exc_info=None):
+                started[:] = [status, headers]
+
+            body = self.app.wsgi_app(environ, start_response)
+            try:
+                chunks = iter(body)
+                first = next(chunks, b'')
+                send_from_thread(_start_message(*started))
+                for chunk in itertools.chain([first], chunks):
+                    if chunk:
+                        send_from_thread(_body_message(chunk))
+                send_from_thread(_body_message(b'', more=False))
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+
+        await asyncio.to_thread(run)
+
+
+application = AsyncApp(create_app())
@@ -0,0 +1,219 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import click
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#
+#   flask assets build
+#
+# concatenates each bundle's sources, minifies the CSS and writes
+# ASSETS_DIR/<name>.<content hash>.<ext> with .gz and (if the brotli package
+# is installed) .br variants next to it, plus a manifest mapping bundle
+# names to those files. Run it on every deploy, before the app starts.
+#
+# Templates call asset_urls(bundle). With ASSETS_BUNDLE on and a manifest
+# built, that is the single hashed file, served from /assets/ with the
+# precompressed variant the client accepts and a year-long immutable
+# Cache-Control: a changed source gets a new name, never a stale copy.
+# Otherwise (development, or no build yet) it lists the sources under
+# /static/ as before.
+#----------------------------------------------------------------------------#
+
+# Bundle name -> sources under static/, in load order.
+BUNDLES = {
+    'main.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    # Loaded blocking in <head>.
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+        'js/script.js',
+    ],
+    # Deferred, after jQuery.
+    'body.js': [
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+MANIFEST = 'manifest.json'
+# Preferred first.
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+ONE_YEAR = 365 * 24 * 60 * 60
+
+_STRING_OR_COMMENT = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/', re.S)
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(text):
+    # Drops comments (except /*! licence */ ones) and the whitespace around
+    # punctuation, leaving strings alone.
+    def squeeze(segment):
+        segment = re.sub(r'\s+', ' ', segment)
+        return re.sub(r' ?([{};,>]) ?', r'\1', segment).replace(';}', '}')
+
+    out, position = [], 0
+    for match in _STRING_OR_COMMENT.finditer(text):
+        out.append(squeeze(text[position:match.start()]))
+        token = match.group()
+        if not token.startswith('/*') or token.startswith('/*!'):
+            out.append(token)
+        position = match.end()
+    out.append(squeeze(text[position:]))
+    return ''.join(out).strip()
+
+
+def absolute_urls(text, source, static_url):
+    # Bundles are served from another directory, so url()s relative to a
+    # source file are rewritten to absolute /static/ paths.
+    def rewrite(match):
+        quote, target = match.groups()
+        if re.match(r'^(?:[a-z]+:|/|#)', target, re.I):
+            return match.group()
+        path, rest = re.match(r'([^?#]*)(.*)', target).groups()
+        resolved = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+        return f'url({quote}{static_url}/{resolved}{rest}{quote})'
+    return _CSS_URL.sub(rewrite, text)
+
+
+def bundle_contents(name, static_folder, static_url):
+    parts = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            text = f.read()
+        if name.endswith('.css'):
+            text = minify_css(absolute_urls(text, source, static_url))
+        parts.append(text)
+    # Minified scripts often end without a semicolon.
+    separator = '\n' if name.endswith('.css') else '\n;\n'
+    return separator.join(parts).encode('utf-8')
+
+
+def compressed_variants(data):
+    # {suffix: bytes} for the encodings that shrink data.
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {suffix: body for suffix, body in variants.items() if len(body) < len(data)}
+
+
+def _write(path, data):
+    # Write-then-rename, so a running server never sends half a file.
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def build(app):
+    # Returns the manifest written.
+    directory = app.config['ASSETS_DIR']
+    os.makedirs(directory, exist_ok=True)
+    manifest = {}
+    for name in BUNDLES:
+        data = bundle_contents(name, app.static_folder, app.static_url_path)
+        stem, ext = os.path.splitext(name)
+        filename = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        _write(os.path.join(directory, filename), data)
+        for suffix, body in compressed_variants(data).items():
+            _write(os.path.join(directory, filename + suffix), body)
+        manifest[name] = filename
+    # Older bundles are left in place for pages still cached with their URLs.
+    _write(os.path.join(directory, MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+class StaticAssets(object):
+
+    def __init__(self):
+        self.manifest = None
+
+    def init_app(self, app):
+        self.manifest = None
+        app.register_blueprint(assets)
+        app.jinja_env.globals['asset_urls'] = self.urls
+        app.cli.add_command(assets_cli)
+
+    def _load(self):
+        # Read once, on first render; {} when bundling is off or unbuilt.
+        manifest = {}
+        if current_app.config['ASSETS_BUNDLE']:
+            try:
+                with open(os.path.join(current_app.config['ASSETS_DIR'], MANIFEST)) as f:
+                    manifest = json.load(f)
+            except FileNotFoundError:
+                current_app.logger.warning("ASSETS_BUNDLE is on but no manifest was built; "
+                                           "serving unbundled assets (run flask assets build)")
+        self.manifest = manifest
+
+    def urls(self, name):
+        if self.manifest is None:
+            self._load()
+        if name in self.manifest:
+            return [url_for('assets.bundle', filename=self.manifest[name])]
+        return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+
+static_assets = StaticAssets()
+
+#----------------------------------------------------------------------------#
+# Serving.
+#----------------------------------------------------------------------------#
+
+assets = Blueprint('assets', __name__, url_prefix='/assets')
+
+
+@assets.route('/<path:filename>')
+def bundle(filename):
+    directory = current_app.config['ASSETS_DIR']
+    path = safe_join(directory, filename)
+    if path is None:
+        raise NotFound()
+    mimetype = mimetypes.guess_type(filename)[0]
+    encoding, suffix = next(((encoding, suffix) for encoding, suffix in ENCODINGS
+                             if request.accept_encodings[encoding]
+                             and os.path.isfile(path + suffix)), (None, ''))
+    response = send_from_directory(directory, filename + suffix, mimetype=mimetype,
+                                   max_age=ONE_YEAR)
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+assets_cli = AppGroup('assets', help='Build the static asset bundles.')
+
+
+@assets_cli.command('build')
+def build_command():
+    """Bundle, fingerprint and precompress the static assets."""
+    app = current_app._get_current_object()
+    directory = app.config['ASSETS_DIR']
+    for name, filename in build(app).items():
+        sizes = [f"{os.path.getsize(os.path.join(directory, filename))} bytes"]
+        sizes += [f"{suffix[1:]} {os.path.getsize(os.path.join(directory, filename + suffix))}"
+                  for _, suffix in ENCODINGS
+                  if os.path.exists(os.path.join(directory, filename + suffix))]
+        click.echo(f"{name} -> {filename} ({', '.join(sizes)})")
@@ -0,0 +1,259 @@
+import os
+import shutil
+import sys
+import tempfile
+import traceback
+
+from benchmarks.common import seed
+
+# Behaviour checks that the timing benchmarks can't express: each function
+# below builds its own app on throwaway SQLite files and asserts. Run by
+# `fab test`.
+#
+#   python -m benchmarks.checks [name ...]
+
+CHECKS = {}
+
+
+def check(function):
+    CHECKS[function.__name__] = function
+    return function
+
+
+def make_app(workdir, **settings):
+    # A testing app on workdir/primary.db, with settings overriding the
+    # testing profile.
+    from config import TestingConfig
+    from app import create_app
+
+    options = {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'primary.db')}",
+        'LOG_FILE': os.path.join(workdir, 'fyyur.log'),
+        'LOG_REQUESTS': False,
+    }
+    options.update(settings)
+    return create_app(type('CheckConfig', (TestingConfig,), options)())
+
+
+def seeded_app(workdir, **settings):
+    from models import db
+    app = make_app(workdir, **settings)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        seed(venues=5, artists=5, shows=50)
+    return app
+
+#----------------------------------------------------------------------------#
+# Checks.
+#----------------------------------------------------------------------------#
+
+
+@check
+def replica_pages_stay_out_of_the_page_cache(workdir):
+    # A page rendered from a lagging replica must not refill an entry a
+    # write has just invalidated.
+    from cache import page_cache
+    from models import db, Venue
+    primary = os.path.join(workdir, 'primary.db')
+    replica = os.path.join(workdir, 'replica.db')
+    app = seeded_app(workdir)
+    shutil.copy(primary, replica)
+    app = make_app(workdir, PAGE_CACHE_TYPE='memory',
+                   SQLALCHEMY_BINDS={'replica_1': f'sqlite:///{replica}'})
+
+    with app.app_context():
+        db.session.get(Venue, 1).name = 'Renamed Venue'
+        db.session.commit()
+    page_cache.delete('venue:1')
+
+    client = app.test_client()
+    response = client.get('/venues/1')
+    assert b'Renamed Venue' not in response.data, "expected the replica's stale page"
+    assert page_cache.backend.get('venue:1') is None, "replica page was cached"
+
+    # The writer reads from the primary, and that page may be cached.
+    with client.session_transaction() as session:
+        session['primary_until'] = 2 ** 31
+    assert b'Renamed Venue' in client.get('/venues/1').data
+    assert 'Renamed Venue' in page_cache.backend.get('venue:1')
+
+
+class FakeRedis(object):
+    # The slice of redis.Redis that RedisCache uses, on a clock the check
+    # moves by hand. Values come back as bytes, as from a real server.
+
+    def __init__(self):
+        self.now = 0
+        self.entries = {}
+
+    def get(self, name):
+        value, deadline = self.entries.get(name, (None, None))
+        if deadline is not None and deadline <= self.now:
+            del self.entries[name]
+            return None
+        return value
+
+    def set(self, name, value, ex=None):
+        self.entries[name] = (value.encode('utf-8'), None if ex is None else self.now + ex)
+
+    def delete(self, *names):
+        for name in names:
+            self.entries.pop(name, None)
+
+
+@check
+def redis_cache_against_a_fake_client(workdir):
+    from cache import RedisCache
+    client = FakeRedis()
+    cache = RedisCache(client)
+    cache.set('venue:1', '<p>one</p>', 60)
+    cache.set('venue:2', '<p>two</p>', 10)
+    assert cache.get('venue:1') == '<p>one</p>'
+    assert set(client.entries) == {'fyyur:page:venue:1', 'fyyur:page:venue:2'}
+    client.now = 10
+    assert cache.get('venue:2') is None, "entry outlived its ttl"
+    assert cache.get('venue:1') == '<p>one</p>'
+    cache.delete('venue:1', 'venue:3')
+    assert cache.get('venue:1') is None
+    cache.delete()
+
+
+@check
+def production_warns_without_a_shared_page_cache(workdir):
+    import logging
+    from cache import NullCache, page_cache
+    records = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    handler = Collect()
+    logging.getLogger('app').addHandler(handler)
+    try:
+        make_app(workdir, PAGE_CACHE_TYPE=None)
+    finally:
+        logging.getLogger('app').removeHandler(handler)
+    assert isinstance(page_cache.backend, NullCache)
+    assert any('Page cache disabled' in message for message in records), records
+
+
+@check
+def export_import_round_trip(workdir):
+    # `flask export` output restores into an empty database with --keep-ids,
+    # empty optional links included.
+    from datetime import datetime
+    from sqlalchemy import select
+    from export import export_command
+    from importer import import_command
+    from models import db, Venue, Artist, Show
+
+    def normal(value):
+        # CSV writes NULL as "", and exports keep whole seconds.
+        if isinstance(value, datetime):
+            return value.replace(microsecond=0)
+        return '' if value is None else value
+
+    def snapshot():
+        return {model.__tablename__: [tuple(map(normal, row)) for row in db.session.execute(
+            select(*[model.__table__.c[name] for name in columns]).order_by(model.id))]
+            for model, columns in (
+                (Venue, ('id', 'name', 'genres', 'website_link', 'facebook_link', 'seeking_talent',
+                         'upcoming_show_count', 'past_show_count')),
+                (Artist, ('id', 'name', 'genres', 'website_link', 'facebook_link', 'seeking_venue',
+                          'upcoming_show_count', 'past_show_count')),
+                (Show, ('id', 'venue_id', 'artist_id', 'start_time')))}
+
+    source = seeded_app(workdir)
+    with source.app_context():
+        expected = snapshot()
+
+    for format, extension in (('csv', 'csv'), ('ndjson', 'jsonl')):
+        target = make_app(workdir, SQLALCHEMY_DATABASE_URI=(
+            f"sqlite:///{os.path.join(workdir, f'restored_{format}.db')}"))
+        with target.app_context():
+            db.create_all(bind_key=None)
+        for entity in ('venues', 'artists', 'shows'):
+            path = os.path.join(workdir, f'{entity}.{extension}')
+            result = source.test_cli_runner().invoke(
+                export_command, [entity, '--format', format, '-o', path])
+            assert result.exit_code == 0, result.output
+            result = target.test_cli_runner().invoke(import_command, [entity, path, '--keep-ids'])
+            assert result.exit_code == 0, result.output
+            assert ', 0 rejected' in result.output, result.output
+        with target.app_context():
+            assert snapshot() == expected, f"{format} round trip changed the data"
+
+
+@check
+def click_scripts_skip_the_cli_modules(workdir):
+    # A server or script built on click creates the app inside a click
+    # context; only running flask db or import may load their modules.
+    import subprocess
+    from benchmarks.startup import ROOT
+    probe = (
+        "import click, json, sys\n"
+        "@click.command()\n"
+        "def serve():\n"
+        "    import wsgi\n"
+        "    print(json.dumps([name for name in ('alembic', 'flask_migrate', 'wtforms', 'importer')\n"
+        "                      if name in sys.modules]))\n"
+        "serve()\n")
+    env = dict(os.environ, FYYUR_ENV='testing', LOG_FILE=os.path.join(workdir, 'fyyur.log'))
+    output = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    assert output.split() == ['[]'], output
+
+
+@check
+def search_matches_name_substrings(workdir):
+    # As on Postgres, a term inside a word matches the name; word prefixes
+    # still match every searched column and rank first.
+    from models import db, Venue
+    from search import search_page
+    app = seeded_app(workdir)
+    with app.app_context():
+        db.session.get(Venue, 2).name = 'The Crowbar'
+        db.session.get(Venue, 4).name = 'Bar Nine'
+        db.session.commit()
+        ids = lambda entity, term: [row['id'] for row in search_page(entity, term).items]
+        assert ids('venue', 'enu') == [1, 3, 5], ids('venue', 'enu')
+        assert ids('artist', 'rtis') == [1, 2, 3, 4, 5], ids('artist', 'rtis')
+        assert ids('venue', 'bar') == [4, 2], ids('venue', 'bar')
+        assert ids('venue', 'zzz') == []
+        assert ids('venue', 'e 5') == [5] and ids('venue', 'ow') == [2]
+        assert ids('venue', '%') == [], "a LIKE wildcard matched"
+        assert search_page('venue', 'bar').total == 2
+
+
+@check
+def show_lookups_use_the_start_time_indexes(workdir):
+    from benchmarks.show_indexes import plans
+    from models import db
+    app = make_app(workdir)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        for index, plan, ok in plans():
+            assert ok, f"{index} not used:\n{plan}"
+
+
+def main(argv):
+    names = argv or list(CHECKS)
+    failures = 0
+    for name in names:
+        workdir = tempfile.mkdtemp(prefix='fyyur_check_')
+        try:
+            CHECKS[name](workdir)
+        except Exception:
+            failures += 1
+            print(f"FAIL {name}")
+            traceback.print_exc()
+        else:
+            print(f"  ok {name}")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
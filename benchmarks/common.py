@@ -0,0 +1,123 @@
+import itertools
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+
+from models import db, Venue, Artist, Show, Genre, venue_genre, artist_genre
+from counters import recount
+
+#----------------------------------------------------------------------------#
+# Shared helpers for the benchmark scripts.
+#----------------------------------------------------------------------------#
+
+CITIES = [
+    ('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'),
+    ('Seattle', 'WA'), ('Chicago', 'IL'), ('Nashville', 'TN'),
+    ('Denver', 'CO'), ('Boston', 'MA'),
+]
+GENRES = ['Jazz', 'Rock n Roll', 'Blues', 'Folk', 'Classical', 'Hip-Hop']
+BATCH_SIZE = 10000
+# Bumped when seed() or the schema changes, so cached databases are rebuilt.
+SEED_VERSION = 3
+
+# Apps built by the benchmarks (and the servers they start) log to a scratch
+# file rather than the tracked error.log, unless LOG_FILE says otherwise.
+# config reads it at import, which every benchmark does after this module.
+os.environ.setdefault('LOG_FILE', os.path.join(tempfile.gettempdir(), 'fyyur_benchmarks.log'))
+
+
+def create_bench_app(uri='sqlite://'):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def _insert(table, rows):
+    # rows may be a generator; at most BATCH_SIZE of them exist at once.
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            return
+        db.session.execute(table.insert(), batch)
+
+
+def _locations(rnd, count):
+    return ((i, rnd.choice(CITIES)) for i in range(1, count + 1))
+
+
+def seed(venues=100, artists=100, shows=0, seed=0):
+    # Bulk-loads a synthetic catalog. Must run inside an app context with
+    # the tables already created.
+    rnd = random.Random(seed)
+    now = datetime.now()
+
+    # One genre each, in the genres column and the association table the
+    # genre filters read.
+    _insert(Genre.__table__, ({"id": i, "name": name}
+                              for i, name in enumerate(GENRES, start=1)))
+    venue_rows = [(i, city, state, rnd.choice(GENRES)) for i, (city, state)
+                  in _locations(rnd, venues)]
+    _insert(Venue.__table__, ({
+        "id": i,
+        "name": f"Venue {i}",
+        "city": city,
+        "state": state,
+        "address": f"{i} Main St",
+        "genres": genre,
+        "seeking_talent": False,
+    } for i, city, state, genre in venue_rows))
+    _insert(venue_genre, ({"venue_id": i, "genre_id": GENRES.index(genre) + 1}
+                          for i, _, _, genre in venue_rows))
+    artist_rows = [(i, city, state, rnd.choice(GENRES)) for i, (city, state)
+                   in _locations(rnd, artists)]
+    _insert(Artist.__table__, ({
+        "id": i,
+        "name": f"Artist {i}",
+        "city": city,
+        "state": state,
+        "genres": genre,
+        "seeking_venue": False,
+    } for i, city, state, genre in artist_rows))
+    _insert(artist_genre, ({"artist_id": i, "genre_id": GENRES.index(genre) + 1}
+                           for i, _, _, genre in artist_rows))
+    if shows:
+        start_times = (now + timedelta(hours=rnd.randint(-24 * 365, 24 * 365))
+                       for _ in range(shows))
+        _insert(Show.__table__, ({
+            "id": i,
+            "venue_id": rnd.randint(1, venues),
+            "artist_id": rnd.randint(1, artists),
+            "start_time": start_time,
+            "counted_past": start_time <= now,
+        } for i, start_time in enumerate(start_times, start=1)))
+        recount()
+    db.session.commit()
+
+
+class QueryCounter(object):
+    # Counts statements sent to the engine while the block is active.
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.elapsed = 0.0
+
+    def _before(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._started
+        event.remove(self.engine, 'before_cursor_execute', self._before)
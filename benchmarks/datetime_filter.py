@@ -0,0 +1,52 @@
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from filters import format_datetime
+
+# Compares the datetime Jinja filter against the previous implementation,
+# which re-parsed a string and let babel compile the pattern on every call.
+#
+#   python -m benchmarks.datetime_filter [values]
+
+VALUES = 10000
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+
+def main(argv):
+    count = int(argv[0]) if argv else VALUES
+    start = datetime(2026, 1, 1, 20, 0)
+    dates = [start + timedelta(hours=i) for i in range(count)]
+    strings = [str(date) for date in dates]
+
+    for format in ('full', 'medium'):
+        expected = [legacy_format_datetime(value, format) for value in strings]
+        assert [format_datetime(value, format) for value in dates] == expected
+        assert [format_datetime(value, format) for value in strings] == expected
+
+    legacy = min(timeit.repeat(
+        lambda: [legacy_format_datetime(value, 'full') for value in strings],
+        number=1, repeat=3))
+    current = min(timeit.repeat(
+        lambda: [format_datetime(value, 'full') for value in dates],
+        number=1, repeat=3))
+    print(f"{count} values")
+    print(f"  legacy (str + parse):      {legacy:.3f}s")
+    print(f"  current (native datetime): {current:.3f}s")
+    print(f"  speedup: {legacy / current:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,52 @@
+import os
+import sys
+
+from benchmarks.common import seed, QueryCounter
+
+# Checks that the venue and artist detail pages cost the same few queries
+# however many shows the venue or artist has, counting every statement a
+# GET of the page sends. Run by `fab test`.
+#
+#   python -m benchmarks.detail_pages [shows ...]
+
+SHOWS = [10, 1000, 100000]
+# The venue or artist row, then its upcoming and past shows in one query.
+EXPECTED_QUERIES = 2
+
+
+def run(shows):
+    from app import create_app
+    from models import db
+    app = create_app()
+    results = []
+    with app.app_context():
+        db.create_all()
+        # Few venues and artists so each one has many shows.
+        seed(venues=5, artists=5, shows=shows)
+        db.session.remove()
+        client = app.test_client()
+        for name in ('venue', 'artist'):
+            with QueryCounter(db.engine) as counter:
+                response = client.get(f'/{name}s/1')
+            assert response.status_code == 200, f"GET /{name}s/1: {response.status_code}"
+            results.append((name, counter))
+        db.drop_all()
+    return results
+
+
+def main(argv):
+    os.environ.setdefault('FYYUR_ENV', 'testing')
+    # Count the database path, not the page cache.
+    os.environ.setdefault('PAGE_CACHE_TYPE', 'null')
+    sizes = [int(arg) for arg in argv] or SHOWS
+    failures = 0
+    print(f"{'page':>8} {'shows':>8} {'queries':>8} {'seconds':>8}")
+    for size in sizes:
+        for name, counter in run(size):
+            failures += counter.count != EXPECTED_QUERIES
+            print(f"{name:>8} {size:>8} {counter.count:>8} {counter.elapsed:>8.3f}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,77 @@
+import http.client
+import threading
+import time
+from collections import namedtuple
+from statistics import quantiles
+
+#----------------------------------------------------------------------------#
+# Concurrent HTTP load generator for the benchmark scripts.
+#
+# Each client thread keeps one keep-alive connection and walks the request
+# list from its own offset until the duration is up. Latencies are kept per
+# request label.
+#----------------------------------------------------------------------------#
+
+Request = namedtuple('Request', 'label method path body')
+FORM = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+def percentiles(samples):
+    # (p50, p95, p99) in milliseconds.
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else 0.0
+        return value, value, value
+    cuts = quantiles(samples, n=100, method='inclusive')
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+
+def _client(host, port, requests, deadline, offset, latencies, errors):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    turn = offset
+    while time.monotonic() < deadline:
+        request = requests[turn % len(requests)]
+        turn += 1
+        started = time.perf_counter()
+        try:
+            connection.request(request.method, request.path, body=request.body,
+                               headers=FORM if request.body else {})
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as error:
+            errors.append((request.label, error))
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        if response.status >= 500:
+            errors.append((request.label, response.status))
+        else:
+            latencies.setdefault(request.label, []).append(time.perf_counter() - started)
+    connection.close()
+
+
+def drive(host, port, requests, concurrency, duration):
+    # Returns ({label: [seconds, ...]}, [(label, error), ...]).
+    deadline = time.monotonic() + duration
+    latencies, errors = {}, []
+    threads = [threading.Thread(target=_client, args=(host, port, requests, deadline,
+                                                      number, latencies, errors))
+               for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def wait_until_up(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=1)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on {host}:{port} did not start")
@@ -0,0 +1,95 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import seed
+from benchmarks.load import percentiles
+
+# Request latency with a slow log sink, written synchronously from the
+# request thread (as the old FileHandler was) and through the queued
+# background writer in logs.py, against not logging at all.
+#
+#   python -m benchmarks.log_sink --sink-ms 5 --requests 2000
+#
+# Every request logs its access line; the sink sleeps --sink-ms per record
+# to stand in for a slow disk or network filesystem.
+
+
+class SlowSink(logging.Handler):
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.written = 0
+
+    def emit(self, record):
+        self.format(record)
+        time.sleep(self.delay)
+        self.written += 1
+
+
+def run(app, handler, requests):
+    client = app.test_client()
+    app.logger.addHandler(handler)
+    latencies = []
+    try:
+        for i in range(requests):
+            started = time.perf_counter()
+            client.get(f'/venues/{i % 100 + 1}')
+            latencies.append(time.perf_counter() - started)
+    finally:
+        app.logger.removeHandler(handler)
+    return latencies
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--sink-ms', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('FYYUR_ENV', 'testing')
+    os.environ['LOG_FILE'] = os.path.join(tempfile.mkdtemp(), 'fyyur.log')
+    os.environ['LOG_REQUESTS'] = '1'
+    from app import create_app
+    from models import db
+    from logs import BackgroundHandler, JsonFormatter, RequestFields, request_logging
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed(venues=100, artists=100, shows=1000)
+    # Only the handlers under test.
+    app.logger.removeHandler(request_logging.handler)
+    app.logger.propagate = False
+
+    print(f"{args.requests} requests, sink {args.sink_ms:g}ms per record")
+    print(f"{'writer':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'total s':>8} "
+          f"{'drain s':>8} {'written':>8} {'dropped':>8}")
+    for mode in ('none', 'sync', 'queued'):
+        sink = SlowSink(args.sink_ms / 1000)
+        sink.setFormatter(JsonFormatter())
+        if mode == 'none':
+            handler = logging.NullHandler()
+        elif mode == 'sync':
+            handler = sink
+        else:
+            handler = BackgroundHandler(sink, app.config['LOG_QUEUE_SIZE'])
+        handler.addFilter(RequestFields())
+
+        started = time.perf_counter()
+        latencies = run(app, handler, args.requests)
+        total = time.perf_counter() - started
+        # Time for the writer to catch up after the last request.
+        handler.close()
+        drain = time.perf_counter() - started - total
+        p50, p95, p99 = percentiles(latencies)
+        print(f"{mode:>8} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f} {total:>8.2f} {drain:>8.2f} "
+              f"{sink.written:>8} {getattr(handler, 'dropped', 0):>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,338 @@
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from sqlalchemy.engine import Engine
+
+from assets import build
+from benchmarks.common import seed, QueryCounter, SEED_VERSION
+from benchmarks.load import Request, drive, percentiles, wait_until_up
+
+# Benchmark suite for every route the app serves.
+#
+#   python -m benchmarks.routes                      # 10k venues, 50k artists, 1M shows
+#   python -m benchmarks.routes --venues 1000 --artists 1000 --shows 20000
+#   python -m benchmarks.routes --write-thresholds   # after an intended change
+#
+# Seeds a SQLite file at the requested scale (kept between runs; --reseed
+# starts over), or uses DATABASE_URL if set. Every scenario below runs
+# --iterations times through the Flask test client, recording latency and
+# statements per request, plus one more run under tracemalloc for peak
+# memory. The read-only scenarios are then replayed concurrently over HTTP
+# against a threaded server in this process, or against --url.
+#
+# Results are checked against thresholds.json. Statement counts are checked
+# at any scale, since growth with the data is what they catch; latency and
+# memory limits only apply at the scale they were recorded at. Any failure
+# exits non-zero.
+
+THRESHOLDS = os.path.join(os.path.dirname(__file__), 'thresholds.json')
+
+Scale = namedtuple('Scale', 'venues artists shows')
+# path is formatted with venue, artist, new_venue and new_artist ids and the
+# main_css bundle name; data is form data or None; load marks read-only
+# scenarios replayed over HTTP.
+Scenario = namedtuple('Scenario', 'name endpoint method path data load')
+
+
+def venue_form(i):
+    return {
+        'name': f'Bench Venue {i}', 'city': 'Austin', 'state': 'TX',
+        'address': f'{i} Bench St', 'phone': '512-555-0100', 'genres': ['Jazz', 'Folk'],
+        'facebook_link': 'https://www.facebook.com/bench', 'seeking_talent': 'y',
+        'seeking_description': 'Bands on weeknights',
+    }
+
+
+def artist_form(i):
+    return {
+        'name': f'Bench Artist {i}', 'city': 'Austin', 'state': 'TX',
+        'phone': '512-555-0101', 'genres': ['Blues'],
+        'facebook_link': 'https://www.facebook.com/bench', 'seeking_venue': 'y',
+    }
+
+
+def show_form(i):
+    start_time = datetime.now() + timedelta(days=i + 1)
+    return {'venue_id': '{venue}', 'artist_id': '{artist}',
+            'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+SCENARIOS = [
+    Scenario('home', 'index', 'GET', '/', None, True),
+    Scenario('venues', 'venues.index', 'GET', '/venues', None, True),
+    Scenario('venues?genre', 'venues.index', 'GET', '/venues?genre=Jazz', None, True),
+    Scenario('venue search', 'venues.search', 'POST', '/venues/search',
+             lambda i: {'search_term': 'Venue 1'}, True),
+    Scenario('venue page', 'venues.show', 'GET', '/venues/{venue}', None, True),
+    Scenario('venue form', 'venues.create_form', 'GET', '/venues/create', None, True),
+    Scenario('venue create', 'venues.create', 'POST', '/venues/create',
+             venue_form, False),
+    Scenario('venue edit form', 'venues.edit_form', 'GET', '/venues/{venue}/edit', None, True),
+    Scenario('venue edit', 'venues.edit', 'POST', '/venues/{venue}/edit',
+             venue_form, False),
+    Scenario('artists', 'artists.index', 'GET', '/artists', None, True),
+    Scenario('artists?genre', 'artists.index', 'GET', '/artists?genre=Blues', None, True),
+    Scenario('artist search', 'artists.search', 'POST', '/artists/search',
+             lambda i: {'search_term': 'Artist 2'}, True),
+    Scenario('artist page', 'artists.show', 'GET', '/artists/{artist}', None, True),
+    Scenario('artist form', 'artists.create_form', 'GET', '/artists/create', None, True),
+    Scenario('artist create', 'artists.create', 'POST', '/artists/create',
+             artist_form, False),
+    Scenario('artist edit form', 'artists.edit_form', 'GET', '/artists/{artist}/edit', None, True),
+    Scenario('artist edit', 'artists.edit', 'POST', '/artists/{artist}/edit',
+             artist_form, False),
+    Scenario('shows', 'shows.index', 'GET', '/shows', None, True),
+    Scenario('shows?upcoming', 'shows.index', 'GET', '/shows?upcoming=1', None, True),
+    Scenario('show form', 'shows.create_form', 'GET', '/shows/create', None, True),
+    Scenario('show create', 'shows.create', 'POST', '/shows/create',
+             show_form, False),
+    Scenario('api venues', 'api.venues', 'GET', '/api/v1/venues', None, True),
+    Scenario('api venue', 'api.venue', 'GET', '/api/v1/venues/{venue}', None, True),
+    Scenario('api artists', 'api.artists', 'GET', '/api/v1/artists', None, True),
+    Scenario('api artist', 'api.artist', 'GET', '/api/v1/artists/{artist}', None, True),
+    Scenario('api shows', 'api.shows', 'GET', '/api/v1/shows?upcoming=1', None, True),
+    Scenario('export', 'export.download', 'GET', '/export/venues.csv', None, False),
+    Scenario('metrics', 'metrics', 'GET', '/metrics', None, False),
+    Scenario('static', 'static', 'GET', '/static/css/bootstrap.css', None, True),
+    Scenario('asset bundle', 'assets.bundle', 'GET', '/assets/{main_css}', None, True),
+    # Last, and aimed at the newest rows, so they remove what the create
+    # scenarios added rather than the seeded catalog.
+    Scenario('venue delete', 'venues.delete', 'DELETE', '/venues/{new_venue}', None, False),
+    Scenario('artist delete', 'artists.delete', 'DELETE', '/artists/{new_artist}', None, False),
+]
+
+
+def uncovered(app):
+    # Endpoints with no scenario.
+    covered = {scenario.endpoint for scenario in SCENARIOS}
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered)
+
+
+def prepare_database(scale, reseed):
+    if os.environ.get('DATABASE_URL'):
+        return os.environ['DATABASE_URL'], False
+    path = os.path.join(tempfile.gettempdir(),
+                        'fyyur_routes_{}_{}_{}_v{}.db'.format(*scale, SEED_VERSION))
+    if reseed and os.path.exists(path):
+        os.remove(path)
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    return os.environ['DATABASE_URL'], not os.path.exists(path)
+
+
+class Ids(object):
+    # Fills scenario paths and form data for iteration i.
+
+    def __init__(self, scale, db, models, bundles):
+        self.scale = scale
+        self.bundles = bundles
+        self.db = db
+        self.venue_model, self.artist_model = models
+
+    def _newest(self, model):
+        return self.db.session.query(self.db.func.max(model.id)).scalar()
+
+    def fill(self, scenario, i):
+        values = {'venue': i % self.scale.venues + 1, 'artist': i % self.scale.artists + 1,
+                  'main_css': self.bundles['main.css']}
+        if '{new_venue}' in scenario.path:
+            values['new_venue'] = self._newest(self.venue_model)
+        if '{new_artist}' in scenario.path:
+            values['new_artist'] = self._newest(self.artist_model)
+        self.db.session.remove()
+        data = None
+        if scenario.data is not None:
+            data = {key: value.format(**values) if isinstance(value, str) else value
+                    for key, value in scenario.data(i).items()}
+        return scenario.path.format(**values), data
+
+
+def measure(app, ids, scenario, iterations):
+    # (latencies, statement counts, peak bytes, failures) over the test client.
+    client = app.test_client()
+    latencies, statements, failures = [], [], []
+    for i in range(iterations + 1):
+        with app.app_context():
+            path, data = ids.fill(scenario, i)
+        last = i == iterations
+        if last:
+            tracemalloc.start()
+        with QueryCounter(Engine) as counter:
+            started = time.perf_counter()
+            response = client.open(path, method=scenario.method, data=data)
+            response.get_data()
+            elapsed = time.perf_counter() - started
+        if last:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            latencies.append(elapsed)
+            statements.append(counter.count)
+        if response.status_code >= 400:
+            failures.append(f"{scenario.method} {path} -> {response.status_code}")
+    return latencies, statements, peak, failures
+
+
+def load_requests(app, ids, count=200):
+    requests = []
+    with app.app_context():
+        for i in range(count):
+            for scenario in SCENARIOS:
+                if scenario.load:
+                    path, data = ids.fill(scenario, i)
+                    body = urlencode(data, doseq=True) if data else None
+                    requests.append(Request(scenario.name, scenario.method, path, body))
+    return requests
+
+
+def serve(app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check(results, load, scale, thresholds):
+    problems = []
+    same_scale = thresholds.get('scale') == scale._asdict()
+    for name, limits in thresholds.get('routes', {}).items():
+        if name not in results:
+            continue
+        result = results[name]
+        if result['statements'] > limits['statements']:
+            problems.append(f"{name}: {result['statements']} statements per request "
+                            f"(limit {limits['statements']})")
+        if same_scale and result['p95_ms'] > limits['p95_ms']:
+            problems.append(f"{name}: p95 {result['p95_ms']:.1f}ms (limit {limits['p95_ms']}ms)")
+        if same_scale and result['peak_kib'] > limits['peak_kib']:
+            problems.append(f"{name}: peak {result['peak_kib']}KiB "
+                            f"(limit {limits['peak_kib']}KiB)")
+    if load and same_scale and 'load' in thresholds:
+        if load['p95_ms'] > thresholds['load']['p95_ms']:
+            problems.append(f"load: p95 {load['p95_ms']:.1f}ms "
+                            f"(limit {thresholds['load']['p95_ms']}ms)")
+    if not same_scale:
+        print(f"(latency and memory limits were recorded at {thresholds.get('scale')}; "
+              "only statement counts are checked)")
+    return problems
+
+
+def write_thresholds(results, load, scale):
+    # Statement counts exactly; latency and memory with headroom for noise.
+    thresholds = {
+        'scale': scale._asdict(),
+        'routes': {name: {
+            'statements': result['statements'],
+            'p95_ms': math.ceil(max(result['p95_ms'] * 2, 5)),
+            'peak_kib': math.ceil(max(result['peak_kib'] * 1.5, 256)),
+        } for name, result in results.items()},
+    }
+    if load:
+        thresholds['load'] = {'p95_ms': math.ceil(max(load['p95_ms'] * 2, 10))}
+    with open(THRESHOLDS, 'w') as out:
+        json.dump(thresholds, out, indent=2)
+        out.write("\n")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--venues', type=int, default=10000)
+    parser.add_argument('--artists', type=int, default=50000)
+    parser.add_argument('--shows', type=int, default=1000000)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='Seconds of HTTP load; 0 skips it.')
+    parser.add_argument('--url', help='host:port of a running server to load instead.')
+    parser.add_argument('--reseed', action='store_true')
+    parser.add_argument('--write-thresholds', action='store_true')
+    args = parser.parse_args(argv)
+    scale = Scale(args.venues, args.artists, args.shows)
+
+    os.environ.setdefault('FYYUR_ENV', 'testing')
+    # Measure the database path, not the page cache.
+    os.environ.setdefault('PAGE_CACHE_TYPE', 'null')
+    _, fresh = prepare_database(scale, args.reseed)
+
+    from app import create_app
+    from models import db, Venue, Artist
+    app = create_app()
+    # Over-budget warnings restate what the table reports.
+    app.logger.setLevel('ERROR')
+    if fresh:
+        print(f"seeding {scale.venues} venues, {scale.artists} artists, {scale.shows} shows")
+        with app.app_context():
+            db.create_all()
+            seed(venues=scale.venues, artists=scale.artists, shows=scale.shows)
+
+    problems = [f"no scenario for endpoint {endpoint}" for endpoint in uncovered(app)]
+    # As a deploy would, so pages link the bundles.
+    ids = Ids(scale, db, (Venue, Artist), build(app))
+    results = {}
+    print(f"{'scenario':<18} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'stmts':>6} {'peak KiB':>9}")
+    for scenario in SCENARIOS:
+        latencies, statements, peak, failures = measure(app, ids, scenario, args.iterations)
+        p50, p95, p99 = percentiles(latencies)
+        results[scenario.name] = {'p95_ms': p95, 'statements': max(statements),
+                                  'peak_kib': math.ceil(peak / 1024)}
+        problems += failures
+        print(f"{scenario.name:<18} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} "
+              f"{max(statements):>6} {math.ceil(peak / 1024):>9}")
+
+    load = None
+    if args.duration > 0:
+        requests = load_requests(app, ids)
+        server = None
+        if args.url:
+            host, port = args.url.rsplit(':', 1)
+            port = int(port)
+        else:
+            server = serve(app)
+            host, port = server.host, server.port
+        try:
+            wait_until_up(host, port)
+            latencies, errors = drive(host, port, requests, args.concurrency, args.duration)
+        finally:
+            if server is not None:
+                server.shutdown()
+        samples = [sample for label in latencies.values() for sample in label]
+        p50, p95, p99 = percentiles(samples)
+        load = {'p95_ms': p95}
+        print(f"\nHTTP load, {args.concurrency} clients for {args.duration:g}s: "
+              f"{len(samples) / args.duration:.1f} req/s, p50 {p50:.1f}ms, "
+              f"p95 {p95:.1f}ms, p99 {p99:.1f}ms, {len(errors)} errors")
+        problems += [f"load: {label} failed: {error}" for label, error in errors[:10]]
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"peak RSS {peak_rss // 1024} MiB")
+
+    if args.write_thresholds:
+        write_thresholds(results, load, scale)
+        print(f"wrote {THRESHOLDS}")
+    elif os.path.exists(THRESHOLDS):
+        with open(THRESHOLDS) as thresholds:
+            problems += check(results, load, scale, json.load(thresholds))
+
+    for problem in problems:
+        print(f"FAIL {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
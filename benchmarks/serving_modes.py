@@ -0,0 +1,97 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import seed
+from benchmarks.load import Request, drive, percentiles, wait_until_up
+
+# Load-tests the read-heavy pages under the sync WSGI server (gunicorn sync
+# workers) and the async ASGI mode (uvicorn asgi:application) with the same
+# number of workers, and prints throughput and latency for each.
+#
+#   DATABASE_URL=postgresql://... python -m benchmarks.serving_modes --workers 2
+#
+# Without DATABASE_URL a seeded SQLite file is used, which shows the
+# plumbing works but not much else: SQLite waits are disk, not network.
+# Needs gunicorn, uvicorn and the asyncio driver (asyncpg or aiosqlite).
+
+PATHS = [
+    ('GET', '/venues', None),
+    ('GET', '/artists', None),
+    ('GET', '/venues/{id}', None),
+    ('GET', '/artists/{id}', None),
+    ('POST', '/venues/search', 'search_term=Venue+1'),
+    ('POST', '/artists/search', 'search_term=Artist'),
+]
+ENTITIES = 200
+# The page mix, cycled over the seeded venue and artist ids.
+REQUESTS = [Request(path, method, path.format(id=number % ENTITIES + 1), body)
+            for number, (method, path, body) in enumerate(PATHS * ENTITIES)]
+SERVERS = {
+    'sync': ['gunicorn', '--workers', '{workers}', '--bind', '127.0.0.1:{port}', 'wsgi:app'],
+    'async': ['uvicorn', '--workers', '{workers}', '--port', '{port}',
+              '--log-level', 'warning', 'asgi:application'],
+}
+
+
+def prepare_database(url):
+    # Seeds a fresh SQLite file when no database is given.
+    if url:
+        return url
+    path = os.path.join(tempfile.gettempdir(), 'fyyur_serving_modes.db')
+    if os.path.exists(path):
+        os.remove(path)
+    url = f'sqlite:///{path}'
+    os.environ['DATABASE_URL'] = url
+    from app import create_app
+    from models import db
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed(venues=ENTITIES, artists=ENTITIES, shows=ENTITIES * 20)
+    return url
+
+
+def run(mode, workers, concurrency, duration, port):
+    command = [part.format(workers=workers, port=port) for part in SERVERS[mode]]
+    server = subprocess.Popen(command, cwd=os.path.dirname(os.path.dirname(__file__)),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up('127.0.0.1', port)
+        latencies, errors = drive('127.0.0.1', port, REQUESTS, concurrency, duration)
+    finally:
+        server.terminate()
+        server.wait()
+    return [sample for samples in latencies.values() for sample in samples], errors
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--port', type=int, default=8700)
+    args = parser.parse_args(argv)
+
+    # The servers inherit these.
+    os.environ.setdefault('FYYUR_ENV', 'production')
+    os.environ.setdefault('SECRET_KEY', 'serving-modes-benchmark')
+    # Measure the database path, not the page cache.
+    os.environ.setdefault('PAGE_CACHE_TYPE', 'null')
+    prepare_database(os.environ.get('DATABASE_URL'))
+
+    print(f"{'mode':>6} {'workers':>8} {'clients':>8} {'req/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for mode in SERVERS:
+        latencies, errors = run(mode, args.workers, args.concurrency, args.duration, args.port)
+        p50, p95, _ = percentiles(latencies)
+        print(f"{mode:>6} {args.workers:>8} {args.concurrency:>8} "
+              f"{len(latencies) / args.duration:>8.1f} {p50:>8.1f} "
+              f"{p95:>8.1f} {len(errors):>7}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,62 @@
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+from models import db, Show
+from benchmarks.common import create_bench_app, seed
+
+# Seeds a database and checks with EXPLAIN that the show lookups used by the
+# detail pages and searches are served from the (entity, start_time) indexes.
+# `fab test` runs the same check on SQLite through benchmarks.checks.
+#
+#   python -m benchmarks.show_indexes [database-uri]
+
+LOOKUPS = {
+    'ix_show_venue_id_start_time': db.select(Show.id).where(
+        Show.venue_id == 42, Show.start_time > datetime(2000, 1, 1)),
+    'ix_show_artist_id_start_time': db.select(Show.id).where(
+        Show.artist_id == 42, Show.start_time > datetime(2000, 1, 1)),
+}
+
+
+def explain(statement):
+    compiled = statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+    if db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+        return "\n".join(row[-1] for row in rows)
+    rows = db.session.execute(text(f"EXPLAIN {compiled}"))
+    return "\n".join(row[0] for row in rows)
+
+
+def plans():
+    # (index, plan, uses the index) for each lookup, on a freshly seeded
+    # database in the current app context.
+    seed(venues=1000, artists=1000, shows=50000)
+    db.session.execute(text("ANALYZE"))
+    # Keep the planner honest on small tables.
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text("SET enable_seqscan = off"))
+    results = []
+    for index, statement in LOOKUPS.items():
+        plan = explain(statement)
+        results.append((index, plan, index in plan))
+    return results
+
+
+def main(argv):
+    app = create_bench_app(argv[0] if argv else 'sqlite://')
+    failures = 0
+    with app.app_context():
+        db.create_all()
+        for index, plan, ok in plans():
+            failures += not ok
+            print(f"{'ok' if ok else 'FAIL':>4} {index}\n{plan}\n")
+        db.session.remove()
+        db.drop_all()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
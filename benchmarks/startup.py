@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Worker startup: the time for a fresh interpreter to import the app, build
+# it with create_app() and serve its first request, as a new gunicorn
+# worker (without --preload) or a restarted container does.
+#
+#   python -m benchmarks.startup --runs 10 --max-ms 600
+#
+# Also fails when a module that only some requests or the flask command
+# need is imported at startup, and lists the heaviest imports
+# (python -X importtime) to show where the time goes.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use: forms, the date filter, and migrations.
+DEFERRED = ('wtforms', 'flask_wtf', 'forms', 'babel', 'dateutil', 'alembic', 'flask_migrate',
+            'importer')
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+deferred = sorted(name for name in {deferred!r} if name in sys.modules)
+application.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - started) * 1000,
+                   'create_ms': (created - imported) * 1000,
+                   'first_ms': (served - created) * 1000,
+                   'deferred': deferred}}))
+'''
+
+
+def probe():
+    output = subprocess.run([sys.executable, '-c', PROBE.format(deferred=DEFERRED)],
+                            cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def heaviest_imports(count):
+    # (cumulative ms, module) for the top-level imports of app.
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, check=True, capture_output=True, text=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # A module is listed after its imports, each level indented by two
+        # more spaces.
+        if name == ' app':
+            break
+        if name.startswith('   ') and not name.startswith('     '):
+            imports.append((int(cumulative) / 1000, name.strip()))
+        elif not name.startswith('   '):
+            imports = []
+    return sorted(imports, reverse=True)[:count]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, default=600.0,
+                        help='Fail when the median import, build and first request take longer.')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('FYYUR_ENV', 'testing')
+    # The app log goes to stderr, not the tracked error.log.
+    os.environ.setdefault('LOG_FILE', '-')
+    # One run first to warm the bytecode cache, as a deployed tree would be.
+    probe()
+    runs = [probe() for _ in range(args.runs)]
+
+    print(f"{args.runs} runs, median ms")
+    for key in ('import_ms', 'create_ms', 'first_ms'):
+        print(f"{key[:-3]:>8} {statistics.median(run[key] for run in runs):>8.1f}")
+    total = statistics.median(run['import_ms'] + run['create_ms'] + run['first_ms']
+                              for run in runs)
+    print(f"{'total':>8} {total:>8.1f}")
+    print("heaviest imports of app, cumulative ms")
+    for ms, name in heaviest_imports(8):
+        print(f"{name:>20} {ms:>8.1f}")
+
+    problems = []
+    if total > args.max_ms:
+        problems.append(f"startup took {total:.0f}ms, over {args.max_ms:g}ms")
+    for name in runs[0]['deferred']:
+        problems.append(f"{name} is imported at startup")
+    for problem in problems:
+        print(f"FAIL {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
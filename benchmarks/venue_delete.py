@@ -0,0 +1,65 @@
+import sys
+import tracemalloc
+
+from models import db, Venue, Artist, Show
+from benchmarks.common import create_bench_app, seed, QueryCounter
+
+# Deletes a venue with 50k shows the way delete_venue() does (the database
+# cascades the shows) and, for comparison, the way it used to (loading every
+# show into the session and deleting them one statement at a time). Checks
+# that the cascade costs a constant number of queries and that the artists'
+# show counters still add up afterwards.
+#
+#   python -m benchmarks.venue_delete [shows...]
+
+SHOWS = [50000]
+ARTISTS = 100
+
+
+def delete_cascade(venue):
+    db.session.delete(venue)
+
+
+def delete_loaded(venue):
+    for show in Show.query.filter(Show.venue_id == venue.id):
+        db.session.delete(show)
+    db.session.delete(venue)
+
+
+def run(shows, delete):
+    app = create_bench_app()
+    with app.app_context():
+        db.create_all()
+        # One venue owns every show.
+        seed(venues=1, artists=ARTISTS, shows=shows)
+        tracemalloc.start()
+        with QueryCounter(db.engine) as counter:
+            delete(db.session.get(Venue, 1))
+            db.session.commit()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        remaining = Show.query.count()
+        counted = db.session.query(
+            db.func.sum(Artist.upcoming_show_count + Artist.past_show_count)).scalar()
+        db.session.remove()
+        db.drop_all()
+    return remaining, counted, counter, peak
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or SHOWS
+    failures = 0
+    print(f"{'mode':>8} {'shows':>8} {'queries':>8} {'seconds':>8} {'peak MiB':>9}")
+    for size in sizes:
+        for name, delete in (('cascade', delete_cascade), ('loaded', delete_loaded)):
+            remaining, counted, counter, peak = run(size, delete)
+            failures += remaining != 0 or counted != 0
+            if name == 'cascade':
+                failures += counter.count > 10
+            print(f"{name:>8} {size:>8} {counter.count:>8} {counter.elapsed:>8.3f} "
+                  f"{peak / 2 ** 20:>9.1f}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,44 @@
+import sys
+
+from models import db
+from queries import venue_areas
+from benchmarks.common import create_bench_app, seed, QueryCounter
+
+# Shows that building the /venues directory costs a constant number of
+# queries regardless of how many venues exist.
+#
+#   python -m benchmarks.venues [sizes...]
+
+SIZES = [100, 1000, 10000, 100000]
+
+
+def run(size):
+    app = create_bench_app()
+    with app.app_context():
+        db.create_all()
+        seed(venues=size, artists=10, shows=size * 2)
+        with QueryCounter(db.engine) as counter:
+            areas = venue_areas()
+        venues = sum(len(area["venues"]) for area in areas)
+        db.session.remove()
+        db.drop_all()
+    return venues, counter
+
+
+def main(argv):
+    sizes = [int(arg) for arg in argv] or SIZES
+    counts = set()
+    print(f"{'venues':>8} {'queries':>8} {'seconds':>8}")
+    for size in sizes:
+        venues, counter = run(size)
+        assert venues == size, venues
+        counts.add(counter.count)
+        print(f"{size:>8} {counter.count:>8} {counter.elapsed:>8.3f}")
+    if len(counts) != 1:
+        print("query count grew with the number of venues", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
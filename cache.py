@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import session
+
+from models import db, Show
+from routing import replica_router
+
+#----------------------------------------------------------------------------#
+# Backends.
+#
+# A backend stores strings under string keys with a per-entry lifetime in
+# seconds. MemoryCache is process-local: an edit, delete or `flask import`
+# only invalidates the entries of the process that made it, so it suits a
+# single web process (development) only. RedisCache shares entries between
+# workers and accepts any client exposing get, set(ex=) and delete, so an
+# in-memory fake can stand in for a Redis server.
+#----------------------------------------------------------------------------#
+
+
+class MemoryCache(object):
+    # Thread-safe LRU with per-entry expiry.
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, deadline = entry
+            if deadline <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(object):
+
+    def __init__(self, client, prefix='fyyur:page:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+
+class NullCache(object):
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+
+class PageCache(object):
+    # Rendered detail pages keyed by entity, e.g. "venue:1".
+    #
+    # Entries live for PAGE_CACHE_TTL seconds or until the next upcoming show
+    # starts, whichever comes first, so a show moves from "upcoming" to
+    # "past" on time. Requests carrying flashed messages neither read nor
+    # fill the cache, since the layout renders those messages into the page.
+    # Only pages rendered from the primary are stored: a lagging replica
+    # could otherwise put back the page a write just invalidated, and the
+    # writer's own sticky-primary reads would then be served it.
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        self.ttl = 300
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('PAGE_CACHE_TYPE', 'memory')
+        self.ttl = app.config.get('PAGE_CACHE_TTL', 300)
+        if kind == 'memory':
+            self.backend = MemoryCache(app.config.get('PAGE_CACHE_SIZE', 1024))
+        elif kind == 'redis':
+            import redis
+            self.backend = RedisCache(
+                redis.Redis.from_url(app.config['PAGE_CACHE_REDIS_URL']))
+        else:
+            self.backend = NullCache()
+            if kind is None:
+                app.logger.warning("Page cache disabled: set REDIS_URL to share it between "
+                                   "workers, or PAGE_CACHE_TYPE=memory for a single process")
+
+    def _bypass(self):
+        return bool(session.get('_flashes'))
+
+    def get(self, key):
+        if self._bypass():
+            return None
+        return self.backend.get(key)
+
+    def set(self, key, html, expires_at=None):
+        if self._bypass() or replica_router.current() is not None:
+            return
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.now()).total_seconds())
+        if ttl >= 1:
+            self.backend.set(key, html, int(ttl))
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    @property
+    def process_local(self):
+        # Deletes here reach no other process's entries.
+        return isinstance(self.backend, MemoryCache)
+
+
+page_cache = PageCache()
+
+#----------------------------------------------------------------------------#
+# Invalidation.
+#
+# A venue page lists its artists' names and images and an artist page lists
+# its venues', so editing or deleting one also invalidates the other side.
+#----------------------------------------------------------------------------#
+
+
+def venue_page_keys(venue_id):
+    artist_ids = db.session.query(Show.artist_id).filter(
+        Show.venue_id == venue_id).distinct()
+    return [f"venue:{venue_id}"] + [f"artist:{row.artist_id}" for row in artist_ids]
+
+
+def artist_page_keys(artist_id):
+    venue_ids = db.session.query(Show.venue_id).filter(
+        Show.artist_id == artist_id).distinct()
+    return [f"artist:{artist_id}"] + [f"venue:{row.venue_id}" for row in venue_ids]
+
+
+def invalidate_venue(venue_id):
+    page_cache.delete(*venue_page_keys(venue_id))
+
+
+def invalidate_artist(artist_id):
+    page_cache.delete(*artist_page_keys(artist_id))
+
+
+def invalidate_show(venue_id, artist_id):
+    page_cache.delete(f"venue:{venue_id}", f"artist:{artist_id}")
@@ -0,0 +1,204 @@
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, case, event, func, or_, select, update
+
+from models import db, Venue, Artist, Show
+
+#----------------------------------------------------------------------------#
+# Materialized show counters.
+#
+# Venue and Artist carry upcoming_show_count and past_show_count so listings
+# and searches read a column instead of counting shows. Each show records
+# which of the two it is counted in (Show.counted_past). Creating or deleting
+# a show through the ORM adjusts both sides in the same flush, as does
+# deleting a venue or artist; bulk inserts and deletes call adjust_counters()
+# themselves.
+#
+# Shows don't move from upcoming to past on their own: `flask counters
+# rollover`, run every minute from cron (or left running with --interval),
+# flips the shows that have started and moves their counts, so listings lag
+# the clock by at most that interval. `flask counters reconcile` checks every
+# counter against the show table; --fix rewrites the ones that drifted.
+#----------------------------------------------------------------------------#
+
+
+def _apply(connection, deltas):
+    # deltas maps Venue/Artist to {id: [upcoming delta, past delta]}. One
+    # executemany per table; updated_at is left alone since the entity
+    # itself wasn't edited.
+    for model, changes in deltas.items():
+        table = model.__table__
+        params = [{'entity_id': entity_id, 'upcoming_delta': upcoming, 'past_delta': past}
+                  for entity_id, (upcoming, past) in changes.items() if upcoming or past]
+        if params:
+            connection.execute(
+                update(table).where(table.c.id == bindparam('entity_id')).values(
+                    upcoming_show_count=table.c.upcoming_show_count + bindparam('upcoming_delta'),
+                    past_show_count=table.c.past_show_count + bindparam('past_delta'),
+                    updated_at=table.c.updated_at),
+                params)
+
+
+def _deltas():
+    return {Venue: defaultdict(lambda: [0, 0]), Artist: defaultdict(lambda: [0, 0])}
+
+
+def adjust_counters(connection, shows, sign=1):
+    # Counts (venue_id, artist_id, counted_past) shows in (sign=1) or out
+    # (sign=-1) of their venue's and artist's counters.
+    deltas = _deltas()
+    for venue_id, artist_id, counted_past in shows:
+        deltas[Venue][venue_id][int(bool(counted_past))] += sign
+        deltas[Artist][artist_id][int(bool(counted_past))] += sign
+    _apply(connection, deltas)
+
+
+@event.listens_for(Show, 'before_insert')
+def _classify_show(mapper, connection, show):
+    show.counted_past = show.start_time <= datetime.now()
+
+
+@event.listens_for(Show, 'after_insert')
+def _count_show(mapper, connection, show):
+    adjust_counters(connection, [(show.venue_id, show.artist_id, show.counted_past)])
+
+
+@event.listens_for(Show, 'after_delete')
+def _uncount_show(mapper, connection, show):
+    adjust_counters(connection, [(show.venue_id, show.artist_id, show.counted_past)], -1)
+
+
+def _uncount_cascade(key, counterpart_key, counterpart):
+    # Deleting a venue or artist takes its shows with it inside the
+    # database, past the ORM events, so take them off the other side's
+    # counters first with one grouped query.
+    def listener(mapper, connection, target):
+        rows = connection.execute(
+            select(counterpart_key, Show.counted_past, func.count())
+            .where(key == target.id)
+            .group_by(counterpart_key, Show.counted_past))
+        deltas = {counterpart: defaultdict(lambda: [0, 0])}
+        for counterpart_id, counted_past, count in rows:
+            deltas[counterpart][counterpart_id][int(bool(counted_past))] -= count
+        _apply(connection, deltas)
+    return listener
+
+
+event.listen(Venue, 'before_delete', _uncount_cascade(Show.venue_id, Show.artist_id, Artist))
+event.listen(Artist, 'before_delete', _uncount_cascade(Show.artist_id, Show.venue_id, Venue))
+
+
+def rollover(now=None):
+    # Moves shows that have started from the upcoming to the past counters.
+    # The UPDATE ... RETURNING claims each show exactly once, so concurrent
+    # runs don't double count. Returns the number of shows moved; the caller
+    # commits.
+    if now is None:
+        now = datetime.now()
+    table = Show.__table__
+    started = db.session.execute(
+        update(table).where(table.c.counted_past.is_(False), table.c.start_time <= now)
+        .values(counted_past=True, updated_at=table.c.updated_at)
+        .returning(table.c.venue_id, table.c.artist_id)).all()
+
+    deltas = _deltas()
+    for venue_id, artist_id in started:
+        for model, entity_id in ((Venue, venue_id), (Artist, artist_id)):
+            deltas[model][entity_id][0] -= 1
+            deltas[model][entity_id][1] += 1
+    _apply(db.session.connection(), deltas)
+    return len(started)
+
+
+def recount():
+    # Sets every counter from the show table in one UPDATE per table, for
+    # bulk loads that bypass adjust_counters(). Expects counted_past to be
+    # set already; the caller commits.
+    for model, key in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+        table = model.__table__
+        shows = select(func.count(Show.id)).where(key == table.c.id)
+        db.session.execute(update(table).values(
+            upcoming_show_count=shows.where(Show.counted_past.is_(False)).scalar_subquery(),
+            past_show_count=shows.where(Show.counted_past.is_(True)).scalar_subquery(),
+            updated_at=table.c.updated_at))
+
+
+def drifted(model, key, now=None):
+    # (id, stored upcoming, stored past, actual upcoming, actual past) for
+    # every row of model whose counters disagree with its shows.
+    if now is None:
+        now = datetime.now()
+    actual = select(
+        key.label('entity_id'),
+        func.count(case((Show.start_time > now, Show.id))).label('upcoming'),
+        func.count(case((Show.start_time <= now, Show.id))).label('past'),
+    ).group_by(key).subquery()
+    upcoming = func.coalesce(actual.c.upcoming, 0)
+    past = func.coalesce(actual.c.past, 0)
+    return db.session.execute(
+        select(model.id, model.upcoming_show_count, model.past_show_count, upcoming, past)
+        .outerjoin(actual, actual.c.entity_id == model.id)
+        .where(or_(model.upcoming_show_count != upcoming, model.past_show_count != past))
+        .order_by(model.id)).all()
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+counters_cli = AppGroup('counters', help='Maintain the materialized show counters.')
+
+
+@counters_cli.command('rollover')
+@click.option('--interval', type=click.IntRange(min=1),
+              help='Keep running, rolling over every INTERVAL seconds.')
+def rollover_command(interval):
+    """Move shows that have started from upcoming to past."""
+    while True:
+        moved = rollover()
+        db.session.commit()
+        click.echo(f"{moved} shows rolled over")
+        if interval is None:
+            return
+        db.session.remove()
+        time.sleep(interval)
+
+
+@counters_cli.command('reconcile')
+@click.option('--fix', is_flag=True, help='Rewrite the counters that drifted.')
+def reconcile_command(fix):
+    """Check the counters against the show table."""
+    # Roll over first so shows that started since the last run don't show
+    # up as drift.
+    now = datetime.now()
+    rollover(now)
+    total = 0
+    for model, key in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+        rows = drifted(model, key, now)
+        total += len(rows)
+        for entity_id, upcoming, past, actual_upcoming, actual_past in rows:
+            click.echo(f"{model.__tablename__} {entity_id}: upcoming {upcoming} "
+                       f"(actual {actual_upcoming}), past {past} (actual {actual_past})")
+        if fix and rows:
+            table = model.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('entity_id')).values(
+                    upcoming_show_count=bindparam('actual_upcoming'),
+                    past_show_count=bindparam('actual_past'),
+                    updated_at=table.c.updated_at),
+                [{'entity_id': row[0], 'actual_upcoming': row[3], 'actual_past': row[4]}
+                 for row in rows])
+    if fix:
+        # Shows whose start_time was moved back into the future.
+        table = Show.__table__
+        db.session.execute(
+            update(table).where(table.c.counted_past.is_(True), table.c.start_time > now)
+            .values(counted_past=False, updated_at=table.c.updated_at))
+    db.session.commit()
+
+    if total and not fix:
+        raise click.ClickException(f"{total} counters drifted; rerun with --fix")
+    click.echo(f"{total} counters {'fixed' if fix else 'drifted'}")
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import click
+from flask import Blueprint, Response, abort, stream_with_context
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from models import db, Venue, Artist, Show
+from routing import replica_reads
+
+#----------------------------------------------------------------------------#
+# Catalog export.
+#
+#   GET /export/shows.csv, /export/venues.ndjson, ...
+#   flask export shows --format ndjson --output shows.ndjson
+#
+# Rows are read with yield_per, which on Postgres means a server-side cursor,
+# and written out one fetched chunk at a time. Memory stays flat however big
+# the table is, and the header goes out before the first row is fetched.
+# Datetimes use the ShowForm format, so `flask import` reads a CSV export
+# back unchanged.
+#----------------------------------------------------------------------------#
+
+CHUNK_SIZE = 1000
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+EXPORTS = {'venues': Venue, 'artists': Artist, 'shows': Show}
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8',
+                 'ndjson': 'application/x-ndjson'}
+
+export = Blueprint('export', __name__, url_prefix='/export')
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    return value
+
+
+def export_chunks(entity, format, chunk_size=CHUNK_SIZE):
+    # Yields the export as text, one chunk of rows per string.
+    model = EXPORTS[entity]
+    columns = [column.name for column in model.__table__.columns]
+    statement = (select(*model.__table__.columns)
+                 .order_by(model.id)
+                 .execution_options(yield_per=chunk_size))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if format == 'csv' else None
+    if writer is not None:
+        writer.writerow(columns)
+        yield buffer.getvalue()
+
+    result = db.session.execute(statement)
+    for rows in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            values = [_value(value) for value in row]
+            if writer is not None:
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(columns, values))))
+                buffer.write("\n")
+        yield buffer.getvalue()
+
+
+@export.route('/<entity>.<format>')
+@replica_reads
+def download(entity, format):
+    if entity not in EXPORTS or format not in CONTENT_TYPES:
+        abort(404)
+    response = Response(stream_with_context(export_chunks(entity, format)),
+                        content_type=CONTENT_TYPES[format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{entity}.{format}"'
+    return response
+
+
+@click.command('export')
+@click.argument('entity', type=click.Choice(sorted(EXPORTS)))
+@click.option('--format', 'format', type=click.Choice(sorted(CONTENT_TYPES)),
+              default='csv', show_default=True)
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8', lazy=True),
+              default='-', help='Defaults to standard output.')
+@with_appcontext
+def export_command(entity, format, output):
+    """Export all venues, artists or shows as CSV or NDJSON."""
+    for chunk in export_chunks(entity, format):
+        output.write(chunk)
+    output.flush()
+    db.session.close()
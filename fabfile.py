@@ -3,12 +3,13 @@ from fabric.contrib.console import confirm
 
 # prepare for deployment
 
+TESTS = ['checks', 'detail_pages', 'routes', 'startup']
+
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local(" && ".join("python -m benchmarks." + script for script in TESTS),
+                       capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
@@ -0,0 +1,36 @@
+from datetime import datetime
+from functools import lru_cache
+
+import babel.dates
+import dateutil.parser
+from babel import Locale
+
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
+
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+@lru_cache(maxsize=64)
+def _datetime_pattern(format, locale):
+    # Compiling the pattern and loading the locale data are the expensive
+    # parts of babel.dates.format_datetime; both are fixed per template call
+    # site, so compile once and reuse.
+    pattern = DATETIME_FORMATS.get(format, format)
+    return babel.dates.parse_pattern(pattern), Locale.parse(locale)
+
+
+def format_datetime(value, format='medium', locale='en'):
+    if not isinstance(value, datetime):
+        date = dateutil.parser.parse(value)
+    else:
+        date = value
+    if format in ('short', 'long'):
+        # Babel's named formats combine the locale's date and time patterns.
+        return babel.dates.format_datetime(date, format, locale=locale)
+    pattern, locale = _datetime_pattern(format, locale)
+    return pattern.apply(date, locale)
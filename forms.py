@@ -1,7 +1,120 @@
+import hashlib
 from datetime import datetime
+from functools import lru_cache
+
 from flask_wtf import Form
+from markupsafe import Markup
 from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms.validators import DataRequired, AnyOf, Optional, URL, ValidationError
+from wtforms.widgets import Select, html_params
+
+#----------------------------------------------------------------------------#
+# Choice catalogs.
+#
+# The state and genre lists are shared by VenueForm and ArtistForm. Each is
+# built once per process: the choices as a tuple, the accepted values as a
+# frozenset (a submitted value is one lookup, not a scan of the list), and
+# a version hashed from the choices. The <select> markup is rendered once
+# per catalog version, selection and attributes and then reused, so a form
+# page no longer renders every option on every view.
+#----------------------------------------------------------------------------#
+
+
+class Catalog(object):
+
+    def __init__(self, values):
+        self.choices = tuple((value, value) for value in values)
+        self.values = frozenset(values)
+        self.version = hashlib.sha1(repr(self.choices).encode()).hexdigest()[:12]
+
+    def __eq__(self, other):
+        return isinstance(other, Catalog) and other.version == self.version
+
+    def __hash__(self):
+        return hash(self.version)
+
+
+STATES = Catalog((
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI', 'ID',
+    'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM',
+    'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'PA',
+    'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY',
+))
+GENRES = Catalog((
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+    'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop',
+    'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other',
+))
+
+
+@lru_cache(maxsize=512)
+def _select_markup(catalog, attributes, selected):
+    html = [f"<select {html_params(**dict(attributes))}>"]
+    html.extend(Select.render_option(value, label, value in selected)
+                for value, label in catalog.choices)
+    html.append("</select>")
+    return Markup("".join(html))
+
+
+class CatalogSelect(Select):
+
+    def __call__(self, field, **kwargs):
+        # The same attributes Select would render.
+        kwargs.setdefault("id", field.id)
+        if self.multiple:
+            kwargs["multiple"] = True
+        flags = vars(field.flags)
+        for flag in self.validation_attrs:
+            if flag in flags and flag not in kwargs:
+                kwargs[flag] = flags[flag]
+        kwargs["name"] = field.name
+        if self.multiple:
+            selected = frozenset(field.data or ())
+        else:
+            selected = frozenset(() if field.data is None else (field.data,))
+        try:
+            return _select_markup(field.catalog, tuple(sorted(kwargs.items())), selected)
+        except TypeError:
+            # Unhashable attribute values are rendered without the cache.
+            del kwargs["name"]
+            return super().__call__(field, **kwargs)
+
+
+class CatalogSelectField(SelectField):
+    widget = CatalogSelect()
+
+    def __init__(self, label=None, validators=None, catalog=None, **kwargs):
+        super().__init__(label, validators, choices=catalog.choices, **kwargs)
+        self.catalog = catalog
+
+    def pre_validate(self, form):
+        if self.data not in self.catalog.values:
+            raise ValidationError(self.gettext("Not a valid choice."))
+
+
+class CatalogSelectMultipleField(SelectMultipleField):
+    widget = CatalogSelect(multiple=True)
+
+    def __init__(self, label=None, validators=None, catalog=None, **kwargs):
+        super().__init__(label, validators, choices=catalog.choices, **kwargs)
+        self.catalog = catalog
+
+    def pre_validate(self, form):
+        unacceptable = set(self.data or ()) - self.catalog.values
+        if unacceptable:
+            raise ValidationError(
+                self.ngettext(
+                    "'%(value)s' is not a valid choice for this field.",
+                    "'%(value)s' are not valid choices for this field.",
+                    len(unacceptable),
+                )
+                % dict(value="', '".join(sorted(unacceptable)))
+            )
+
+#----------------------------------------------------------------------------#
+# Forms.
+#----------------------------------------------------------------------------#
+
 
 class ShowForm(Form):
     artist_id = StringField(
@@ -13,7 +126,7 @@ class ShowForm(Form):
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
-        default= datetime.today()
+        default=datetime.today
     )
 
 class VenueForm(Form):
@@ -23,61 +136,8 @@ class VenueForm(Form):
     city = StringField(
         'city', validators=[DataRequired()]
     )
-    state = SelectField(
-        'state', validators=[DataRequired()],
-        choices=[
-            ('AL', 'AL'),
-            ('AK', 'AK'),
-            ('AZ', 'AZ'),
-            ('AR', 'AR'),
-            ('CA', 'CA'),
-            ('CO', 'CO'),
-            ('CT', 'CT'),
-            ('DE', 'DE'),
-            ('DC', 'DC'),
-            ('FL', 'FL'),
-            ('GA', 'GA'),
-            ('HI', 'HI'),
-            ('ID', 'ID'),
-            ('IL', 'IL'),
-            ('IN', 'IN'),
-            ('IA', 'IA'),
-            ('KS', 'KS'),
-            ('KY', 'KY'),
-            ('LA', 'LA'),
-            ('ME', 'ME'),
-            ('MT', 'MT'),
-            ('NE', 'NE'),
-            ('NV', 'NV'),
-            ('NH', 'NH'),
-            ('NJ', 'NJ'),
-            ('NM', 'NM'),
-            ('NY', 'NY'),
-            ('NC', 'NC'),
-            ('ND', 'ND'),
-            ('OH', 'OH'),
-            ('OK', 'OK'),
-            ('OR', 'OR'),
-            ('MD', 'MD'),
-            ('MA', 'MA'),
-            ('MI', 'MI'),
-            ('MN', 'MN'),
-            ('MS', 'MS'),
-            ('MO', 'MO'),
-            ('PA', 'PA'),
-            ('RI', 'RI'),
-            ('SC', 'SC'),
-            ('SD', 'SD'),
-            ('TN', 'TN'),
-            ('TX', 'TX'),
-            ('UT', 'UT'),
-            ('VT', 'VT'),
-            ('VA', 'VA'),
-            ('WA', 'WA'),
-            ('WV', 'WV'),
-            ('WI', 'WI'),
-            ('WY', 'WY'),
-        ]
+    state = CatalogSelectField(
+        'state', validators=[DataRequired()], catalog=STATES
     )
     address = StringField(
         'address', validators=[DataRequired()]
@@ -88,33 +148,11 @@ class VenueForm(Form):
     image_link = StringField(
         'image_link'
     )
-    genres = SelectMultipleField(
-        # TODO implement enum restriction
-        'genres', validators=[DataRequired()],
-        choices=[
-            ('Alternative', 'Alternative'),
-            ('Blues', 'Blues'),
-            ('Classical', 'Classical'),
-            ('Country', 'Country'),
-            ('Electronic', 'Electronic'),
-            ('Folk', 'Folk'),
-            ('Funk', 'Funk'),
-            ('Hip-Hop', 'Hip-Hop'),
-            ('Heavy Metal', 'Heavy Metal'),
-            ('Instrumental', 'Instrumental'),
-            ('Jazz', 'Jazz'),
-            ('Musical Theatre', 'Musical Theatre'),
-            ('Pop', 'Pop'),
-            ('Punk', 'Punk'),
-            ('R&B', 'R&B'),
-            ('Reggae', 'Reggae'),
-            ('Rock n Roll', 'Rock n Roll'),
-            ('Soul', 'Soul'),
-            ('Other', 'Other'),
-        ]
+    genres = CatalogSelectMultipleField(
+        'genres', validators=[DataRequired()], catalog=GENRES
     )
     facebook_link = StringField(
-        'facebook_link', validators=[URL()]
+        'facebook_link', validators=[Optional(), URL()]
     )
     website_link = StringField(
         'website_link'
@@ -135,61 +173,8 @@ class ArtistForm(Form):
     city = StringField(
         'city', validators=[DataRequired()]
     )
-    state = SelectField(
-        'state', validators=[DataRequired()],
-        choices=[
-            ('AL', 'AL'),
-            ('AK', 'AK'),
-            ('AZ', 'AZ'),
-            ('AR', 'AR'),
-            ('CA', 'CA'),
-            ('CO', 'CO'),
-            ('CT', 'CT'),
-            ('DE', 'DE'),
-            ('DC', 'DC'),
-            ('FL', 'FL'),
-            ('GA', 'GA'),
-            ('HI', 'HI'),
-            ('ID', 'ID'),
-            ('IL', 'IL'),
-            ('IN', 'IN'),
-            ('IA', 'IA'),
-            ('KS', 'KS'),
-            ('KY', 'KY'),
-            ('LA', 'LA'),
-            ('ME', 'ME'),
-            ('MT', 'MT'),
-            ('NE', 'NE'),
-            ('NV', 'NV'),
-            ('NH', 'NH'),
-            ('NJ', 'NJ'),
-            ('NM', 'NM'),
-            ('NY', 'NY'),
-            ('NC', 'NC'),
-            ('ND', 'ND'),
-            ('OH', 'OH'),
-            ('OK', 'OK'),
-            ('OR', 'OR'),
-            ('MD', 'MD'),
-            ('MA', 'MA'),
-            ('MI', 'MI'),
-            ('MN', 'MN'),
-            ('MS', 'MS'),
-            ('MO', 'MO'),
-            ('PA', 'PA'),
-            ('RI', 'RI'),
-            ('SC', 'SC'),
-            ('SD', 'SD'),
-            ('TN', 'TN'),
-            ('TX', 'TX'),
-            ('UT', 'UT'),
-            ('VT', 'VT'),
-            ('VA', 'VA'),
-            ('WA', 'WA'),
-            ('WV', 'WV'),
-            ('WI', 'WI'),
-            ('WY', 'WY'),
-        ]
+    state = CatalogSelectField(
+        'state', validators=[DataRequired()], catalog=STATES
     )
     phone = StringField(
         # TODO implement validation logic for state
@@ -198,33 +183,12 @@ class ArtistForm(Form):
     image_link = StringField(
         'image_link'
     )
-    genres = SelectMultipleField(
-        'genres', validators=[DataRequired()],
-        choices=[
-            ('Alternative', 'Alternative'),
-            ('Blues', 'Blues'),
-            ('Classical', 'Classical'),
-            ('Country', 'Country'),
-            ('Electronic', 'Electronic'),
-            ('Folk', 'Folk'),
-            ('Funk', 'Funk'),
-            ('Hip-Hop', 'Hip-Hop'),
-            ('Heavy Metal', 'Heavy Metal'),
-            ('Instrumental', 'Instrumental'),
-            ('Jazz', 'Jazz'),
-            ('Musical Theatre', 'Musical Theatre'),
-            ('Pop', 'Pop'),
-            ('Punk', 'Punk'),
-            ('R&B', 'R&B'),
-            ('Reggae', 'Reggae'),
-            ('Rock n Roll', 'Rock n Roll'),
-            ('Soul', 'Soul'),
-            ('Other', 'Other'),
-        ]
-     )
+    genres = CatalogSelectMultipleField(
+        'genres', validators=[DataRequired()], catalog=GENRES
+    )
     facebook_link = StringField(
         # TODO implement enum restriction
-        'facebook_link', validators=[URL()]
+        'facebook_link', validators=[Optional(), URL()]
      )
 
     website_link = StringField(
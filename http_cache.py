@@ -0,0 +1,163 @@
+import gzip
+import hashlib
+from functools import wraps
+
+from flask import make_response
+from werkzeug.datastructures import Headers, ResponseCacheControl
+from werkzeug.http import parse_accept_header, parse_cache_control_header, \
+    parse_etags, parse_set_header, unquote_etag
+
+#----------------------------------------------------------------------------#
+# Response compression and HTTP caching.
+#
+# WSGI middleware over the whole app. For a complete 200 response to a GET
+# it
+#   - adds a weak ETag (a hash of the body) when the view set none, and
+#     answers a matching If-None-Match with 304 Not Modified;
+#   - compresses bodies of at least COMPRESS_MIN_SIZE bytes of a textual
+#     type with brotli (if installed) or gzip, whichever the client prefers;
+#   - turns public into private caching when the response sets a cookie.
+#
+# Streamed responses (no Content-Length, e.g. exports), responses already
+# encoded (asset bundles) and HEAD requests pass through untouched.
+#
+# Views declare their Cache-Control policy with @cache_control; routes
+# without one send none, as before.
+#----------------------------------------------------------------------------#
+
+# Shared caches may keep listings briefly; a new show appears within a minute.
+LISTING = 'public, max-age=60'
+# Revalidated on every view, cheaply thanks to the ETag.
+PAGE = 'no-cache'
+# Forms are never stored: they show live data just before a write.
+FORM = 'no-store'
+
+COMPRESSIBLE = ('text/', 'application/json', 'application/javascript',
+                'application/xml', 'application/x-ndjson', 'image/svg+xml')
+# Larger bodies are not buffered.
+MAX_BUFFER = 8 * 1024 * 1024
+
+
+def cache_control(policy):
+    # Sets Cache-Control on the view's 200 responses, unless it set its own.
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and 'Cache-Control' not in response.headers:
+                response.headers['Cache-Control'] = policy
+            return response
+        return wrapped
+    return decorator
+
+
+def weak_etag(data):
+    return 'W/"{}"'.format(hashlib.sha1(data).hexdigest()[:20])
+
+
+def _compressors():
+    compressors = {'gzip': lambda data, level: gzip.compress(data, compresslevel=level)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        # Brotli's quality scale runs to 11; dynamic content wants the middle.
+        compressors['br'] = lambda data, level: brotli.compress(data, quality=min(level, 11))
+    return compressors
+
+
+COMPRESSORS = _compressors()
+
+
+class HttpCache(object):
+    # Each app gets its own middleware, kept in app.extensions['http_cache'].
+
+    def init_app(self, app):
+        middleware = CachingMiddleware(
+            app.wsgi_app, app.config['COMPRESS_MIN_SIZE'],
+            {'gzip': app.config['COMPRESS_GZIP_LEVEL'],
+             'br': app.config['COMPRESS_BROTLI_QUALITY']})
+        app.wsgi_app = middleware
+        app.extensions['http_cache'] = middleware
+
+
+class CachingMiddleware(object):
+
+    def __init__(self, wsgi_app, min_size, levels):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.levels = levels
+        self.compressors = COMPRESSORS
+
+    def __call__(self, environ, start_response):
+        started = []
+
+        def capture(status, headers, exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started[:] = [status, headers]
+            return written.append
+
+        written = []
+        body = self.wsgi_app(environ, capture)
+        status, headers, body = self.finish(environ, started[0], started[1], body, written)
+        start_response(status, headers)
+        return body
+
+    def finish(self, environ, status, headers, body, written=()):
+        # (status, headers, body) to send in place of the app's.
+        headers = Headers(headers)
+        if (environ['REQUEST_METHOD'] != 'GET' or not status.startswith('200 ')
+                or 'Content-Encoding' in headers or 'Content-Length' not in headers
+                or int(headers['Content-Length']) > MAX_BUFFER):
+            if written:
+                body = list(written) + list(body)
+            return status, headers.to_wsgi_list(), body
+
+        try:
+            data = b''.join(list(written) + list(body))
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+        cache = parse_cache_control_header(headers.get('Cache-Control'), cls=ResponseCacheControl)
+        if 'Set-Cookie' in headers and cache.public:
+            # Shared caches must not hand one client's cookie to the next.
+            cache.public = False
+            cache.private = True
+            headers['Cache-Control'] = cache.to_header()
+        if 'ETag' not in headers and not cache.no_store:
+            headers['ETag'] = weak_etag(data)
+
+        if 'ETag' in headers:
+            etag, _ = unquote_etag(headers['ETag'])
+            if parse_etags(environ.get('HTTP_IF_NONE_MATCH')).contains_weak(etag):
+                for name in ('Content-Length', 'Content-Type'):
+                    headers.pop(name, None)
+                return '304 NOT MODIFIED', headers.to_wsgi_list(), []
+
+        content_type = headers.get('Content-Type', '')
+        if len(data) >= self.min_size and content_type.startswith(COMPRESSIBLE):
+            vary = parse_set_header(headers.get('Vary'))
+            vary.add('Accept-Encoding')
+            headers['Vary'] = vary.to_header()
+            encoding = self._negotiate(environ.get('HTTP_ACCEPT_ENCODING'))
+            if encoding is not None:
+                data = self.compressors[encoding](data, self.levels[encoding])
+                headers['Content-Encoding'] = encoding
+                headers['Content-Length'] = str(len(data))
+                # A strong ETag from the view named the unencoded bytes.
+                etag = headers.get('ETag')
+                if etag and not etag.startswith('W/'):
+                    headers['ETag'] = 'W/' + etag
+        return status, headers.to_wsgi_list(), [data]
+
+    def _negotiate(self, header):
+        # The supported encoding the client weighs highest, brotli on a tie.
+        accepted = parse_accept_header(header)
+        best = max(self.compressors, key=lambda encoding: (accepted[encoding], encoding == 'br'))
+        return best if accepted[best] else None
+
+
+http_cache = HttpCache()
@@ -0,0 +1,295 @@
+import csv
+import json
+import os
+from collections import namedtuple
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import insert, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import MultiDict
+
+from cache import page_cache
+from counters import adjust_counters
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, Genre, venue_genre, artist_genre, parse_genres
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#
+#   flask import venues partners.csv
+#   flask import shows shows.jsonl --batch-size 5000
+#
+# Streams CSV (header row) or JSON Lines records, validates each one with
+# the same form the create pages use and inserts the valid ones in batches,
+# one executemany per table and one commit per batch. Rejected records go
+# to an error report (JSON Lines, one per record with its batch, record
+# number and form errors) and the rest of the batch is still imported.
+#
+# After every committed batch the position is saved to a checkpoint file.
+# Rerunning the same command resumes after the last committed batch;
+# --restart ignores the checkpoint. The checkpoint is removed once the
+# whole file has been imported.
+#
+# `flask export` output reads back in. The columns the database maintains
+# itself (show counters, counted_past, updated_at) are ignored, and so is
+# id, rows getting new ones, unless --keep-ids is passed to restore an
+# export into an empty database with its ids, and so its shows'
+# references, intact.
+#----------------------------------------------------------------------------#
+
+BATCH_SIZE = 1000
+FALSE_VALUES = ('', '0', 'false', 'f', 'no', 'n', 'off')
+
+Entity = namedtuple('Entity', 'form model genre_table genre_key booleans')
+
+ENTITIES = {
+    'venues': Entity(VenueForm, Venue, venue_genre, 'venue_id', ('seeking_talent',)),
+    'artists': Entity(ArtistForm, Artist, artist_genre, 'artist_id', ('seeking_venue',)),
+    'shows': Entity(ShowForm, Show, None, None, ()),
+}
+
+
+def read_records(path, format):
+    # Yields (record number, dict) without loading the file.
+    with open(path, newline='', encoding='utf-8') as source:
+        if format == 'csv':
+            for number, record in enumerate(csv.DictReader(source), start=1):
+                yield number, record
+        else:
+            number = 0
+            for line in source:
+                if line.strip():
+                    number += 1
+                    try:
+                        yield number, json.loads(line)
+                    except ValueError:
+                        yield number, line.rstrip('\n')
+
+
+def _formdata(record, booleans):
+    data = MultiDict()
+    for key, value in record.items():
+        if value is None:
+            continue
+        if key == 'genres':
+            data.setlist(key, parse_genres(value))
+        elif key in booleans:
+            # BooleanField treats any non-empty string as checked.
+            if str(value).strip().lower() not in FALSE_VALUES:
+                data[key] = 'y'
+        else:
+            data[key] = str(value)
+    return data
+
+
+def validate(entity, record, keep_ids=False):
+    # Returns (row, None) or (None, errors).
+    if not isinstance(record, dict):
+        return None, {'record': ['Not a JSON object.']}
+    if entity.model is Show and not record.get('start_time'):
+        # The form would fall back to its default of "now".
+        return None, {'start_time': ['This field is required.']}
+    form = entity.form(formdata=_formdata(record, entity.booleans), meta={'csrf': False})
+    if not form.validate():
+        return None, form.errors
+    row = {field.name: field.data for field in form if field.name != 'genres'}
+    if entity.model is Show:
+        errors = {}
+        for key in ('venue_id', 'artist_id'):
+            try:
+                row[key] = int(row[key])
+            except (TypeError, ValueError):
+                errors[key] = ['Not a valid id.']
+        if errors:
+            return None, errors
+    else:
+        row['genres'] = form.genres.data
+    if keep_ids:
+        try:
+            row['id'] = int(record.get('id'))
+        except (TypeError, ValueError):
+            return None, {'id': ['Not a valid id.']}
+    return row, None
+
+
+def _missing_references(rows):
+    # Show rows pointing at venues or artists that don't exist.
+    venue_ids = set(db.session.scalars(select(Venue.id).where(
+        Venue.id.in_({row['venue_id'] for row in rows}))))
+    artist_ids = set(db.session.scalars(select(Artist.id).where(
+        Artist.id.in_({row['artist_id'] for row in rows}))))
+    missing = {}
+    for index, row in enumerate(rows):
+        errors = {}
+        if row['venue_id'] not in venue_ids:
+            errors['venue_id'] = ['No such venue.']
+        if row['artist_id'] not in artist_ids:
+            errors['artist_id'] = ['No such artist.']
+        if errors:
+            missing[index] = errors
+    return missing
+
+
+def _genre_ids(names, known):
+    # Fills known (name -> id) with any of names it lacks, creating genres
+    # that don't exist yet.
+    wanted = set(names) - set(known)
+    if wanted:
+        known.update(db.session.execute(
+            select(Genre.name, Genre.id).where(Genre.name.in_(wanted))).all())
+        new = sorted(wanted - set(known))
+        if new:
+            ids = db.session.scalars(
+                insert(Genre).returning(Genre.id, sort_by_parameter_order=True),
+                [{'name': name} for name in new]).all()
+            known.update(zip(new, ids))
+    return known
+
+
+def insert_batch(entity, rows, genres):
+    # One executemany per table. Returns the number of rows inserted.
+    if not rows:
+        return 0
+    if entity.genre_table is None:
+        # Bulk inserts skip the ORM events that keep the show counters.
+        now = datetime.now()
+        for row in rows:
+            row['counted_past'] = row['start_time'] <= now
+        db.session.execute(insert(entity.model), rows)
+        adjust_counters(db.session.connection(), [
+            (row['venue_id'], row['artist_id'], row['counted_past']) for row in rows])
+        return len(rows)
+
+    names = [row.pop('genres') for row in rows]
+    for row, row_names in zip(rows, names):
+        row['genres'] = ",".join(row_names)
+    ids = db.session.scalars(
+        insert(entity.model).returning(entity.model.id, sort_by_parameter_order=True),
+        rows).all()
+
+    _genre_ids({name for row_names in names for name in row_names}, genres)
+    links = [{entity.genre_key: entity_id, 'genre_id': genres[name]}
+             for entity_id, row_names in zip(ids, names) for name in row_names]
+    if links:
+        db.session.execute(insert(entity.genre_table), links)
+    return len(rows)
+
+
+def _save_checkpoint(path, state):
+    partial = path + '.tmp'
+    with open(partial, 'w') as checkpoint:
+        json.dump(state, checkpoint)
+    os.replace(partial, path)
+
+
+@click.command('import')
+@click.argument('entity_name', metavar='ENTITY', type=click.Choice(sorted(ENTITIES)))
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']),
+              help='Input format; taken from the file extension by default.')
+@click.option('--batch-size', default=BATCH_SIZE, show_default=True,
+              type=click.IntRange(min=1), help='Records per insert and commit.')
+@click.option('--checkpoint', 'checkpoint_path', type=click.Path(dir_okay=False),
+              help='Defaults to SOURCE.checkpoint.')
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False),
+              help='Defaults to SOURCE.errors.jsonl.')
+@click.option('--restart', is_flag=True, help='Ignore an existing checkpoint.')
+@click.option('--keep-ids', is_flag=True,
+              help="Insert the records' id column, e.g. restoring an export.")
+@with_appcontext
+def import_command(entity_name, source, format, batch_size, checkpoint_path,
+                   errors_path, restart, keep_ids):
+    """Bulk import venues, artists or shows from CSV or JSON Lines."""
+    entity = ENTITIES[entity_name]
+    if format is None:
+        format = 'csv' if source.lower().endswith('.csv') else 'jsonl'
+    checkpoint_path = checkpoint_path or source + '.checkpoint'
+    errors_path = errors_path or source + '.errors.jsonl'
+    if entity.model is Show and page_cache.process_local:
+        click.echo("Warning: PAGE_CACHE_TYPE=memory is per process, so running web workers "
+                   "keep their cached venue and artist pages for up to PAGE_CACHE_TTL "
+                   "seconds. Use PAGE_CACHE_TYPE=redis to invalidate them from here.", err=True)
+
+    state = {'entity': entity_name, 'record': 0, 'batch': 0, 'imported': 0, 'rejected': 0}
+    if not restart and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as checkpoint:
+            state = json.load(checkpoint)
+        if state.get('entity') != entity_name:
+            raise click.ClickException(
+                f"{checkpoint_path} belongs to a {state.get('entity')} import; "
+                "pass --restart to start over")
+        click.echo(f"Resuming after record {state['record']}")
+
+    genres = {}
+    report = open(errors_path, 'a' if state['record'] else 'w', encoding='utf-8')
+
+    def flush(batch):
+        state['batch'] += 1
+        valid, rejected = [], []
+        for number, record in batch:
+            row, errors = validate(entity, record, keep_ids)
+            if errors:
+                rejected.append((number, record, errors))
+            else:
+                valid.append((number, record, row))
+        if entity.model is Show and valid:
+            missing = _missing_references([row for _, _, row in valid])
+            rejected += [(number, record, missing[index])
+                         for index, (number, record, _) in enumerate(valid)
+                         if index in missing]
+            valid = [item for index, item in enumerate(valid) if index not in missing]
+        rows = [row for _, _, row in valid]
+
+        try:
+            imported = insert_batch(entity, rows, genres)
+            db.session.commit()
+        except SQLAlchemyError as error:
+            db.session.rollback()
+            raise click.ClickException(
+                f"Batch {state['batch']} (records {batch[0][0]}-{batch[-1][0]}) failed: "
+                f"{getattr(error, 'orig', None) or error}. "
+                f"Rerun to resume after record {state['record']}.")
+
+        if entity.model is Show:
+            page_cache.delete(*{f"venue:{row['venue_id']}" for row in rows},
+                              *{f"artist:{row['artist_id']}" for row in rows})
+        for number, record, errors in sorted(rejected, key=lambda item: item[0]):
+            report.write(json.dumps({'batch': state['batch'], 'record': number,
+                                     'errors': errors, 'data': record}, default=str) + "\n")
+        report.flush()
+
+        state['record'] = batch[-1][0]
+        state['imported'] += imported
+        state['rejected'] += len(rejected)
+        _save_checkpoint(checkpoint_path, state)
+        click.echo(f"batch {state['batch']}: records {batch[0][0]}-{batch[-1][0]}, "
+                   f"{imported} imported, {len(rejected)} rejected")
+
+    try:
+        batch = []
+        for number, record in read_records(source, format):
+            if number <= state['record']:
+                continue
+            batch.append((number, record))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        if keep_ids and db.engine.dialect.name == 'postgresql':
+            # Explicit ids don't advance the sequence new rows draw from.
+            table = entity.model.__tablename__
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT coalesce(max(id), 1) FROM {table}))"))
+            db.session.commit()
+    finally:
+        report.close()
+        db.session.close()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    click.echo(f"{state['imported']} {entity_name} imported, {state['rejected']} rejected"
+               + (f" (see {errors_path})" if state['rejected'] else ""))
@@ -0,0 +1,173 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import current_app, g, has_request_context, request
+from flask.logging import default_handler
+
+#----------------------------------------------------------------------------#
+# Application log.
+#
+# Records go onto a bounded in-memory queue and a background thread writes
+# them to LOG_FILE (- for stderr) as JSON lines, rotating at LOG_MAX_BYTES.
+# A request thread never waits on the disk: when the writer falls
+# LOG_QUEUE_SIZE records behind, new records are dropped and counted.
+#
+# Records logged during a request carry its id (X-Request-ID, taken from
+# the request when a proxy set one), method, path and endpoint; with
+# LOG_REQUESTS on, every request also logs one line with its status and
+# latency.
+#
+# The writer thread starts on first use in each process, so it survives
+# gunicorn's fork. Rotation is per process: with several workers, give
+# each its own LOG_FILE or set LOG_MAX_BYTES=0 and rotate externally.
+#----------------------------------------------------------------------------#
+
+# LogRecord attributes that are not extra fields.
+_STANDARD = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items()
+                     if key not in _STANDARD)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestFields(logging.Filter):
+    # Runs before the record is queued, while the request is still current.
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+            record.endpoint = request.endpoint
+        return True
+
+
+class BackgroundHandler(QueueHandler):
+    # Hands records to a QueueListener writing to target.
+
+    def __init__(self, target, maxsize):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target
+        self.listener = None
+        self.pid = None
+        self.dropped = 0
+
+    def emit(self, record):
+        # Handler.handle() holds self.lock here.
+        if self.pid != os.getpid():
+            self._start()
+        super().emit(record)
+
+    def _start(self):
+        # A forked child gets a fresh queue: the parent's writer thread did
+        # not come along.
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        self.pid = os.getpid()
+        atexit.register(self._stop)
+
+    def prepare(self, record):
+        # Resolve the message and traceback now; the writer thread must not
+        # touch arguments the request may still change.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.dropped:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"{self.dropped} log records dropped; the writer fell behind"}))
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _stop(self):
+        # Writes out what is still queued.
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+
+    def close(self):
+        self._stop()
+        self.target.close()
+        super().close()
+
+
+class RequestLogging(object):
+
+    def __init__(self):
+        self.handler = None
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        if app.debug:
+            # Flask's own stderr handler is enough under the reloader.
+            return
+        if app.config['LOG_FILE'] == '-':
+            target = logging.StreamHandler(sys.stderr)
+        else:
+            target = RotatingFileHandler(app.config['LOG_FILE'],
+                                         maxBytes=app.config['LOG_MAX_BYTES'],
+                                         backupCount=app.config['LOG_BACKUP_COUNT'], delay=True)
+        target.setFormatter(JsonFormatter())
+        if self.handler is not None:
+            # A second create_app(): every app shares the 'app' logger.
+            app.logger.removeHandler(self.handler)
+            self.handler.close()
+        self.handler = BackgroundHandler(target, app.config['LOG_QUEUE_SIZE'])
+        self.handler.addFilter(RequestFields())
+        app.logger.setLevel(app.config['LOG_LEVEL'])
+        # In place of Flask's handler, which writes to stderr synchronously.
+        app.logger.removeHandler(default_handler)
+        app.logger.addHandler(self.handler)
+
+    def _start(self):
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.log_started = time.perf_counter()
+
+    def _finish(self, response):
+        if 'request_id' not in g:
+            return response
+        response.headers.setdefault('X-Request-ID', g.request_id)
+        if current_app.config['LOG_REQUESTS']:
+            current_app.logger.info(
+                "%s %s %s", request.method, request.path, response.status_code,
+                extra={'status': response.status_code,
+                       'duration_ms': round((time.perf_counter() - g.log_started) * 1000, 2)})
+        return response
+
+
+request_logging = RequestLogging()
@@ -0,0 +1,171 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, before_render_template, g, request, template_rendered
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Metrics.
+#
+# Prometheus text exposition at /metrics, with no client library or agent.
+# Every worker thread writes to its own shard of plain dicts, so recording
+# takes no lock and never contends; a scrape sums the shards. Histograms
+# store per-bucket counts and are made cumulative only when scraped.
+#----------------------------------------------------------------------------#
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ShardedCounters(object):
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            # Only taken once per thread.
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def inc(self, key, amount=1):
+        shard = self._shard()
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        shard = self._shard()
+        bucket = (name, 'bucket', labels, bisect_left(buckets, value))
+        for key, amount in ((bucket, 1), ((name, 'count', labels), 1),
+                            ((name, 'sum', labels), value)):
+            shard[key] = shard.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for key, value in shard.copy().items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+def _labels(**labels):
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _pool_stats(engine):
+    # QueuePool exposes all of these; SQLite's static/singleton pools don't.
+    pool = engine.pool
+    stats = {}
+    for name in ('size', 'checkedout', 'overflow', 'checkedin'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+class Metrics(object):
+
+    HISTOGRAMS = {
+        'fyyur_request_duration_seconds': ('Request latency by endpoint.', 'endpoint'),
+        'fyyur_template_render_seconds': ('Template render time.', 'template'),
+    }
+    POOL_GAUGES = {
+        'size': ('fyyur_db_pool_size', 'Configured pool size.'),
+        'checkedout': ('fyyur_db_pool_checked_out', 'Connections in use.'),
+        'overflow': ('fyyur_db_pool_overflow', 'Connections beyond pool size.'),
+        'checkedin': ('fyyur_db_pool_checked_in', 'Idle connections in the pool.'),
+    }
+
+    def __init__(self, app=None):
+        self.counters = ShardedCounters()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        app.add_url_rule('/metrics', 'metrics', self.render)
+
+    def _start(self):
+        g.metrics_started = time.perf_counter()
+
+    def _finish(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        self.counters.observe('fyyur_request_duration_seconds', (endpoint,),
+                              time.perf_counter() - started)
+        self.counters.inc(('fyyur_requests_total', endpoint, response.status_code))
+        return response
+
+    def _template_started(self, sender, template, context, **extra):
+        g.setdefault('template_started', []).append(time.perf_counter())
+
+    def _template_finished(self, sender, template, context, **extra):
+        stack = g.get('template_started')
+        if stack:
+            self.counters.observe('fyyur_template_render_seconds',
+                                  (template.name or 'string',),
+                                  time.perf_counter() - stack.pop())
+
+    def _engines(self):
+        engines = getattr(db, 'engines', None)
+        if engines:
+            return {bind or 'default': engine for bind, engine in engines.items()}
+        return {'default': db.engine}
+
+    def render(self):
+        totals = self.counters.snapshot()
+        lines = []
+
+        for name, (description, label) in self.HISTOGRAMS.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            series = sorted({key[2] for key in totals
+                             if key[0] == name and key[1] == 'count'})
+            for labels in series:
+                series_labels = {label: labels[0]}
+                cumulative = 0
+                for index, bound in enumerate(LATENCY_BUCKETS + (float('inf'),)):
+                    cumulative += totals.get((name, 'bucket', labels, index), 0)
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(le=le, **series_labels)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(**series_labels)} "
+                             f"{totals[(name, 'sum', labels)]}")
+                lines.append(f"{name}_count{_labels(**series_labels)} "
+                             f"{totals[(name, 'count', labels)]}")
+
+        lines.append("# HELP fyyur_requests_total Requests by endpoint and status.")
+        lines.append("# TYPE fyyur_requests_total counter")
+        for key in sorted(key for key in totals if key[0] == 'fyyur_requests_total'):
+            lines.append(f"fyyur_requests_total{_labels(endpoint=key[1], status=key[2])} "
+                         f"{totals[key]}")
+
+        pools = {bind: _pool_stats(engine) for bind, engine in self._engines().items()}
+        for stat, (name, description) in self.POOL_GAUGES.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            for bind, stats in sorted(pools.items()):
+                if stat in stats:
+                    lines.append(f"{name}{_labels(bind=bind)} {stats[stat]}")
+
+        return Response("\n".join(lines) + "\n",
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+metrics = Metrics()
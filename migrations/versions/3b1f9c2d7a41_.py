@@ -0,0 +1,31 @@
+"""add show lookup indexes
+
+Revision ID: 3b1f9c2d7a41
+Revises: e4c4481fa3aa
+Create Date: 2026-10-18 09:12:40.512733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f9c2d7a41'
+down_revision = 'e4c4481fa3aa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_show_venue_id_start_time', 'show',
+                    ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_show_artist_id_start_time', 'show',
+                    ['artist_id', 'start_time'], unique=False)
+    op.create_index(op.f('ix_show_start_time'), 'show',
+                    ['start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_show_start_time'), table_name='show')
+    op.drop_index('ix_show_artist_id_start_time', table_name='show')
+    op.drop_index('ix_show_venue_id_start_time', table_name='show')
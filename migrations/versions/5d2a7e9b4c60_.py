@@ -0,0 +1,90 @@
+"""normalize venue and artist genres
+
+Revision ID: 5d2a7e9b4c60
+Revises: 8c5e0a6d2f17
+Create Date: 2026-10-18 13:02:55.804117
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a7e9b4c60'
+down_revision = '8c5e0a6d2f17'
+branch_labels = None
+depends_on = None
+
+
+def _parse_genres(value):
+    # Same rules as models.parse_genres at the time of this revision.
+    if not value:
+        return []
+    names = re.sub(r"^[\[{]|[\]}]$", "", value.strip()).split(",")
+    names = (name.strip().strip("'\"") for name in names)
+    return [name for name in names if name]
+
+
+def _migrate_genres(bind, entity, genre_ids):
+    entity_table = sa.table(entity, sa.column('id', sa.Integer),
+                            sa.column('genres', sa.String))
+    link_table = sa.table(f'{entity}_genre', sa.column(f'{entity}_id', sa.Integer),
+                          sa.column('genre_id', sa.Integer))
+    genre_table = sa.table('genre', sa.column('id', sa.Integer),
+                           sa.column('name', sa.String))
+
+    links = []
+    for row in bind.execute(sa.select(entity_table.c.id, entity_table.c.genres)).fetchall():
+        names = list(dict.fromkeys(_parse_genres(row.genres)))
+        for name in names:
+            if name not in genre_ids:
+                genre_ids[name] = bind.execute(
+                    genre_table.insert().values(name=name).returning(genre_table.c.id)
+                ).scalar()
+            links.append({f'{entity}_id': row.id, 'genre_id': genre_ids[name]})
+        bind.execute(entity_table.update().where(entity_table.c.id == row.id)
+                     .values(genres=",".join(names)))
+    if links:
+        bind.execute(link_table.insert(), links)
+
+
+def upgrade():
+    op.create_table('genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('venue_genre',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['venue.id'], ),
+    sa.PrimaryKeyConstraint('venue_id', 'genre_id')
+    )
+    op.create_index('ix_venue_genre_genre_id_venue_id', 'venue_genre',
+                    ['genre_id', 'venue_id'], unique=False)
+    op.create_table('artist_genre',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artist.id'], ),
+    sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ),
+    sa.PrimaryKeyConstraint('artist_id', 'genre_id')
+    )
+    op.create_index('ix_artist_genre_genre_id_artist_id', 'artist_genre',
+                    ['genre_id', 'artist_id'], unique=False)
+
+    bind = op.get_bind()
+    genre_ids = {}
+    _migrate_genres(bind, 'venue', genre_ids)
+    _migrate_genres(bind, 'artist', genre_ids)
+
+
+def downgrade():
+    op.drop_index('ix_artist_genre_genre_id_artist_id', table_name='artist_genre')
+    op.drop_table('artist_genre')
+    op.drop_index('ix_venue_genre_genre_id_venue_id', table_name='venue_genre')
+    op.drop_table('venue_genre')
+    op.drop_table('genre')
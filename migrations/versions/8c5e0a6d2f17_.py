@@ -0,0 +1,72 @@
+"""add venue and artist search indexes
+
+Revision ID: 8c5e0a6d2f17
+Revises: 3b1f9c2d7a41
+Create Date: 2026-10-18 10:41:03.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c5e0a6d2f17'
+down_revision = '3b1f9c2d7a41'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venue', 'artist')
+COLUMNS = ('name', 'city', 'state', 'genres')
+
+
+def _postgres_upgrade():
+    document = " || ' ' || ".join(f"coalesce({name}, '')" for name in COLUMNS)
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table in TABLES:
+        op.execute(
+            f"CREATE INDEX ix_{table}_search_document ON {table} "
+            f"USING gin (to_tsvector('simple', {document}))")
+        op.execute(
+            f"CREATE INDEX ix_{table}_name_trgm ON {table} "
+            f"USING gin (name gin_trgm_ops)")
+
+
+def _sqlite_upgrade():
+    names = ", ".join(COLUMNS)
+    new_values = ", ".join(f"new.{name}" for name in COLUMNS)
+    old_values = ", ".join(f"old.{name}" for name in COLUMNS)
+    for table in TABLES:
+        fts = f"{table}_search"
+        delete_old = (f"INSERT INTO {fts}({fts}, rowid, {names}) "
+                      f"VALUES ('delete', old.id, {old_values});")
+        insert_new = (f"INSERT INTO {fts}(rowid, {names}) "
+                      f"VALUES (new.id, {new_values});")
+        op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                   f"{names}, content='{table}', content_rowid='id')")
+        op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} "
+                   f"BEGIN {insert_new} END")
+        op.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} "
+                   f"BEGIN {delete_old} END")
+        op.execute(f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table} "
+                   f"BEGIN {delete_old} {insert_new} END")
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        _postgres_upgrade()
+    elif dialect == 'sqlite':
+        _sqlite_upgrade()
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        if dialect == 'postgresql':
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_name_trgm")
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_document")
+        elif dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_search_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_search")
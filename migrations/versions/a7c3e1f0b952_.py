@@ -0,0 +1,27 @@
+"""add updated_at row versions
+
+Revision ID: a7c3e1f0b952
+Revises: 5d2a7e9b4c60
+Create Date: 2026-10-18 14:26:31.447390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e1f0b952'
+down_revision = '5d2a7e9b4c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist', 'show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                       server_default=sa.func.now()))
+
+
+def downgrade():
+    for table in ('show', 'artist', 'venue'):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,69 @@
+"""materialized upcoming/past show counters
+
+Revision ID: c2f8d4b6a913
+Revises: a7c3e1f0b952
+Create Date: 2026-10-18 15:02:12.118406
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2f8d4b6a913'
+down_revision = 'a7c3e1f0b952'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('upcoming_show_count', sa.Integer(),
+                                       nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_show_count', sa.Integer(),
+                                       nullable=False, server_default='0'))
+    op.add_column('show', sa.Column('counted_past', sa.Boolean(), nullable=False,
+                                    server_default=sa.false()))
+
+    # Backfill from the show table as of now, by the app's clock as the
+    # counters use it; `flask counters rollover` takes over from here.
+    bind = op.get_bind()
+    bind.execute(sa.text("UPDATE show SET counted_past = start_time <= :now"),
+                 {'now': datetime.now()})
+    for table, key in (('venue', 'venue_id'), ('artist', 'artist_id')):
+        if bind.dialect.name == 'postgresql':
+            op.execute(f"""
+                UPDATE {table} SET
+                    upcoming_show_count = counts.upcoming,
+                    past_show_count = counts.past
+                FROM (
+                    SELECT {key} AS id,
+                           count(*) FILTER (WHERE NOT counted_past) AS upcoming,
+                           count(*) FILTER (WHERE counted_past) AS past
+                    FROM show GROUP BY {key}
+                ) AS counts
+                WHERE {table}.id = counts.id
+            """)
+        else:
+            op.execute(f"""
+                UPDATE {table} SET
+                    upcoming_show_count = (SELECT count(*) FROM show
+                                           WHERE show.{key} = {table}.id
+                                           AND NOT show.counted_past),
+                    past_show_count = (SELECT count(*) FROM show
+                                       WHERE show.{key} = {table}.id
+                                       AND show.counted_past)
+            """)
+
+    op.create_index('ix_show_start_time_pending_rollover', 'show', ['start_time'],
+                    unique=False, postgresql_where=sa.text('NOT counted_past'),
+                    sqlite_where=sa.text('NOT counted_past'))
+
+def downgrade():
+    op.drop_index('ix_show_start_time_pending_rollover', table_name='show')
+    op.drop_column('show', 'counted_past')
+    for table in ('artist', 'venue'):
+        op.drop_column(table, 'past_show_count')
+        op.drop_column(table, 'upcoming_show_count')
@@ -0,0 +1,48 @@
+"""delete shows and genre links with their venue or artist
+
+Revision ID: d91b3e7c5a28
+Revises: c2f8d4b6a913
+Create Date: 2026-10-18 15:40:55.902137
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91b3e7c5a28'
+down_revision = 'c2f8d4b6a913'
+branch_labels = None
+depends_on = None
+
+# (table, column, referenced table), using Postgres' default constraint names.
+FOREIGN_KEYS = [
+    ('show', 'venue_id', 'venue'),
+    ('show', 'artist_id', 'artist'),
+    ('venue_genre', 'venue_id', 'venue'),
+    ('artist_genre', 'artist_id', 'artist'),
+]
+
+
+# Gives SQLite's unnamed foreign keys those names when batch mode reflects
+# them, so they can be dropped.
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+
+def _recreate(ondelete):
+    # Batch mode, as SQLite can't alter constraints; it rebuilds the table
+    # there and issues plain ALTERs on Postgres.
+    for table, column, referent in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch:
+            batch.drop_constraint(name, type_='foreignkey')
+            batch.create_foreign_key(name, referent, [column], ['id'],
+                                     ondelete=ondelete)
+
+
+def upgrade():
+    _recreate('CASCADE')
+
+
+def downgrade():
+    _recreate(None)
@@ -0,0 +1,48 @@
+"""add venue and artist name substring indexes on sqlite
+
+Revision ID: e6b0f4a9c317
+Revises: d91b3e7c5a28
+Create Date: 2026-10-18 19:12:36.540813
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b0f4a9c317'
+down_revision = 'd91b3e7c5a28'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venue', 'artist')
+
+# Postgres already has ix_<table>_name_trgm from 8c5e0a6d2f17.
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in TABLES:
+        fts = f"{table}_name_trgm"
+        delete_old = (f"INSERT INTO {fts}({fts}, rowid, name) "
+                      f"VALUES ('delete', old.id, old.name);")
+        insert_new = f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name);"
+        op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                   f"name, content='{table}', content_rowid='id', tokenize='trigram')")
+        op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} "
+                   f"BEGIN {insert_new} END")
+        op.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} "
+                   f"BEGIN {delete_old} END")
+        op.execute(f"CREATE TRIGGER {fts}_au AFTER UPDATE OF name ON {table} "
+                   f"BEGIN {delete_old} {insert_new} END")
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table in TABLES:
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_name_trgm_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {table}_name_trgm")
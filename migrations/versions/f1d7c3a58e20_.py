@@ -0,0 +1,37 @@
+"""widen venue and artist genres to text
+
+Revision ID: f1d7c3a58e20
+Revises: e6b0f4a9c317
+Create Date: 2026-10-18 19:48:02.371554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1d7c3a58e20'
+down_revision = 'e6b0f4a9c317'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venue', 'artist')
+
+# VARCHAR(120) held about a dozen genre names. SQLite doesn't enforce the
+# length, and rebuilding the tables there would drop their search triggers.
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    for table in TABLES:
+        op.alter_column(table, 'genres', type_=sa.Text(),
+                        existing_type=sa.String(length=120), existing_nullable=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        return
+    for table in TABLES:
+        op.alter_column(table, 'genres', type_=sa.String(length=120),
+                        existing_type=sa.Text(), existing_nullable=True)
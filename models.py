@@ -1,9 +1,83 @@
+import re
+import sqlite3
+from datetime import datetime
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from routing import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys, and so ON DELETE CASCADE, unless asked.
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+def parse_genres(value):
+    # Genres used to be stored as a stringified list, e.g. "{Jazz,Blues}"
+    # from Postgres array adaptation or "['Jazz', 'Blues']"; new rows store
+    # "Jazz,Blues". Accepts all three.
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [name for name in value if name]
+    names = re.sub(r"^[\[{]|[\]}]$", "", value.strip()).split(",")
+    names = (name.strip().strip("'\"") for name in names)
+    return [name for name in names if name]
+
+
+venue_genre = db.Table(
+    'venue_genre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+    db.Index('ix_venue_genre_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+
+artist_genre = db.Table(
+    'artist_genre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+    db.Index('ix_artist_genre_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
+
+
+class Genre(db.Model):
+    __tablename__ = 'genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+
+class GenreMixin(object):
+    # The association table is the source of truth used for filtering;
+    # the genres column keeps a comma-separated copy for display and for
+    # the search index. Always write through set_genres().
+
+    @property
+    def genre_names(self):
+        return parse_genres(self.genres)
 
-db = SQLAlchemy()
+    def set_genres(self, names):
+        names = list(dict.fromkeys(parse_genres(names)))
+        existing = {}
+        if names:
+            existing = {genre.name: genre for genre in
+                        Genre.query.filter(Genre.name.in_(names))}
+        self.tagged_genres = [existing.get(name) or Genre(name=name)
+                              for name in names]
+        self.genres = ",".join(names)
 
 
-class Venue(db.Model):
+class Venue(GenreMixin, db.Model):
     __tablename__ = 'venue'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -14,15 +88,24 @@ class Venue(db.Model):
     phone = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genres = db.Column(db.Text)
     website_link = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
+    # Maintained by counters.py; listings read these instead of counting shows.
+    upcoming_show_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_show_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
+    # Shows and genre links go with the venue through ON DELETE CASCADE;
+    # the ORM never loads them just to delete them.
     show = db.relationship("Show", backref="venue",
-                           lazy=True, cascade="all, delete")
+                           lazy=True, passive_deletes='all')
+    tagged_genres = db.relationship("Genre", secondary=venue_genre, lazy=True,
+                                    passive_deletes=True)
 
 
-class Artist(db.Model):
+class Artist(GenreMixin, db.Model):
     __tablename__ = 'artist'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -30,20 +113,44 @@ class Artist(db.Model):
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genres = db.Column(db.Text)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean, nullable=False)
     seeking_description = db.Column(db.String(500), default=False)
+    # Maintained by counters.py; listings read these instead of counting shows.
+    upcoming_show_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_show_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
     show = db.relationship('Show', backref='artist',
-                           lazy=True, cascade="all, delete")
+                           lazy=True, passive_deletes='all')
+    tagged_genres = db.relationship('Genre', secondary=artist_genre, lazy=True,
+                                    passive_deletes=True)
 
 
 class Show(db.Model):
     __tablename__ = 'show'
+    # Detail pages and searches filter on venue/artist plus start_time; the
+    # composite indexes also cover plain venue_id/artist_id lookups.
+    __table_args__ = (
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        # The counter rollover only ever looks for shows not yet counted as
+        # past, which is a small slice of the table.
+        db.Index('ix_show_start_time_pending_rollover', 'start_time',
+                 postgresql_where=db.text('NOT counted_past'),
+                 sqlite_where=db.text('NOT counted_past')),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    start_time = db.Column(db.DateTime, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False, index=True)
     artist_id = db.Column(db.Integer, db.ForeignKey(
-        "artist.id"), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey("venue.id"), nullable=False)
+        "artist.id", ondelete="CASCADE"), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey(
+        "venue.id", ondelete="CASCADE"), nullable=False)
+    # Which of its venue's and artist's counters the show is in.
+    counted_past = db.Column(db.Boolean, nullable=False, default=False,
+                             server_default=db.false())
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                           onupdate=datetime.utcnow, server_default=db.func.now())
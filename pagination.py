@@ -0,0 +1,121 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import func, literal, select, text, tuple_
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#
+# Pages are addressed by an opaque cursor holding the sort key of the last
+# row served, so fetching page N costs the same as fetching page 1 instead
+# of scanning and discarding N * per_page rows as OFFSET does.
+#----------------------------------------------------------------------------#
+
+PER_PAGE = 20
+
+Page = namedtuple('Page', ['items', 'total', 'next_cursor', 'estimated'])
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(value) for value in values],
+                     separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    # Malformed or tampered cursors restart from the first page.
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(values, list):
+            return None
+        return [_decode_value(value) for value in values]
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _cursor_values(values, columns):
+    # The cursor's values checked against the key columns' types; None when
+    # one doesn't fit, e.g. a hand-edited cursor with a string for an
+    # integer id, which Postgres would reject with an error.
+    if values is None or len(values) != len(columns):
+        return None
+    checked = []
+    for value, column in zip(values, columns):
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            # Untyped expressions, e.g. a constant search rank.
+            checked.append(value)
+            continue
+        if python_type is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if not isinstance(value, python_type) or (
+                isinstance(value, bool) and python_type is not bool):
+            return None
+        checked.append(value)
+    return checked
+
+
+def count_rows(statement):
+    return db.session.execute(
+        select(func.count()).select_from(statement.order_by(None).subquery())
+    ).scalar()
+
+
+def estimate_rows(model):
+    # Planner estimate for an unfiltered table on Postgres, where COUNT(*)
+    # has to visit every row; exact everywhere else. Returns (total, estimated).
+    if db.engine.dialect.name == 'postgresql':
+        estimate = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+            {"name": model.__tablename__}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate, True
+    return db.session.query(func.count(model.id)).scalar(), False
+
+
+def keyset_page(statement, keys, cursor=None, per_page=PER_PAGE, total=None):
+    # statement must be orderable ascending and uniquely by the columns named
+    # in keys (the last one is normally the primary key). When total is None
+    # an exact COUNT of the statement is issued; pass (total, estimated) to
+    # supply it another way.
+    subquery = statement.order_by(None).subquery()
+    columns = [subquery.c[key] for key in keys]
+
+    page = select(subquery)
+    after = _cursor_values(decode_cursor(cursor), columns)
+    if after is not None:
+        bound = [literal(value, column.type)
+                 for value, column in zip(after, columns)]
+        page = page.where(tuple_(*columns) > tuple_(*bound))
+    rows = db.session.execute(
+        page.order_by(*columns).limit(per_page + 1)).mappings().all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][key] for key in keys)
+
+    if total is None:
+        total = (count_rows(statement), False)
+    return Page(rows, total[0], next_cursor, total[1])
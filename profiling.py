@@ -0,0 +1,114 @@
+import heapq
+import html
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# Per-request SQL profiling.
+#
+# Counts every statement the request sends to any engine, with the time
+# spent in the driver, and keeps the slowest few. The totals go out as a
+# Server-Timing header; requests over the configured budget are logged, and
+# in debug mode an HTML panel listing the statements is appended to pages.
+#----------------------------------------------------------------------------#
+
+
+class QueryStats(object):
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []
+        self.started = time.perf_counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.total += elapsed
+        entry = (elapsed, self.count, statement)
+        if len(self.slowest) < self.keep:
+            heapq.heappush(self.slowest, entry)
+        elif elapsed > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def slowest_first(self):
+        return sorted(self.slowest, reverse=True)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    if has_request_context():
+        stats = g.get('query_stats')
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - started)
+
+
+class QueryProfiler(object):
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('QUERY_PROFILER', True):
+            return
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g.query_stats = QueryStats(current_app.config.get('QUERY_SLOWEST', 5))
+
+    def _finish(self, response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        config = current_app.config
+        elapsed_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.total * 1000
+
+        response.headers.add(
+            'Server-Timing', f'db;dur={db_ms:.1f};desc="{stats.count} queries"')
+        response.headers.add('Server-Timing', f'app;dur={elapsed_ms:.1f}')
+
+        if (stats.count > config.get('QUERY_BUDGET_COUNT', 20)
+                or db_ms > config.get('QUERY_BUDGET_MS', 200)):
+            current_app.logger.warning(
+                "%s %s over query budget: %d queries, %.1fms in db; slowest: %s",
+                request.method, request.path, stats.count, db_ms,
+                " | ".join(f"{elapsed * 1000:.1f}ms {statement}"
+                           for elapsed, _, statement in stats.slowest_first()))
+
+        if (config.get('QUERY_DEBUG_PANEL', False)
+                and response.mimetype == 'text/html'
+                and not response.direct_passthrough):
+            self._inject_panel(response, stats, db_ms)
+        return response
+
+    def _inject_panel(self, response, stats, db_ms):
+        rows = "".join(
+            f"<li><code>{elapsed * 1000:.2f}ms</code> {html.escape(statement)}</li>"
+            for elapsed, _, statement in stats.slowest_first())
+        panel = (
+            '<div id="query-profiler" style="position:fixed;bottom:0;right:0;'
+            'max-width:50%;max-height:40%;overflow:auto;background:#fff;'
+            'border:1px solid #ccc;padding:8px;font-size:11px;z-index:9999">'
+            f"<strong>{stats.count} queries, {db_ms:.1f}ms</strong><ol>{rows}</ol></div>")
+        body = response.get_data(as_text=True)
+        if '</body>' in body:
+            body = body.replace('</body>', panel + '</body>', 1)
+        else:
+            body += panel
+        response.set_data(body)
+
+
+query_profiler = QueryProfiler()
@@ -0,0 +1,230 @@
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import case, func
+
+from models import db, Venue, Artist, Show, Genre, venue_genre, artist_genre
+
+#----------------------------------------------------------------------------#
+# Genre filtering.
+#----------------------------------------------------------------------------#
+
+
+def with_genre(query, model, genre):
+    # Restricts a venue or artist query to one genre through the association
+    # table, served by the genre name and (genre_id, entity_id) indexes.
+    association, key = {
+        Venue: (venue_genre, 'venue_id'),
+        Artist: (artist_genre, 'artist_id'),
+    }[model]
+    return query.join(association, association.c[key] == model.id).join(
+        Genre, Genre.id == association.c.genre_id).filter(Genre.name == genre)
+
+#----------------------------------------------------------------------------#
+# Venue queries.
+#----------------------------------------------------------------------------#
+
+
+def venue_areas(genre=None):
+    # Builds the city/state -> venues -> upcoming show count tree used by
+    # /venues from a single query over the venue table, reading the
+    # materialized counters.
+    query = db.session.query(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.upcoming_show_count.label('num_upcoming_shows')
+    )
+    if genre:
+        query = with_genre(query, Venue, genre)
+    rows = query.order_by(Venue.state, Venue.city, Venue.id).all()
+
+    areas = []
+    for (city, state), venues in groupby(rows, key=lambda row: (row.city, row.state)):
+        areas.append({
+            "city": city,
+            "state": state,
+            "venues": [{
+                "id": venue.id,
+                "name": venue.name,
+                "num_upcoming_shows": venue.num_upcoming_shows
+            } for venue in venues]
+        })
+    return areas
+
+
+def venue_listing(genre=None):
+    # Ordered by id for keyset pagination.
+    statement = db.select(
+        Venue.id, Venue.name, Venue.city, Venue.state, Venue.genres,
+        Venue.image_link, Venue.upcoming_show_count, Venue.updated_at)
+    if genre:
+        statement = with_genre(statement, Venue, genre)
+    return statement.order_by(Venue.id)
+
+
+def venue_detail(venue_id, now=None):
+    # Everything the venue page and API show, or None if there is no venue.
+    venue = db.session.get(Venue, venue_id)
+    if venue is None:
+        return None
+    upcoming_shows, past_shows = venue_shows(venue_id, now)
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": venue.genre_names,
+        "city": venue.city,
+        "state": venue.state,
+        "address": venue.address,
+        "phone": venue.phone,
+        "website": venue.website_link,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "seeking_description": venue.seeking_description,
+        "image_link": venue.image_link,
+        "upcoming_shows_count": len(upcoming_shows),
+        "past_shows_count": len(past_shows),
+        "upcoming_shows": upcoming_shows,
+        "past_shows": past_shows,
+    }
+
+#----------------------------------------------------------------------------#
+# Artist queries.
+#----------------------------------------------------------------------------#
+
+
+def artist_listing(genre=None):
+    # Ordered by id for keyset pagination.
+    statement = db.select(
+        Artist.id, Artist.name, Artist.city, Artist.state, Artist.genres,
+        Artist.image_link, Artist.upcoming_show_count, Artist.updated_at)
+    if genre:
+        statement = with_genre(statement, Artist, genre)
+    return statement.order_by(Artist.id)
+
+
+def artist_detail(artist_id, now=None):
+    # Everything the artist page and API show, or None if there is no artist.
+    artist = db.session.get(Artist, artist_id)
+    if artist is None:
+        return None
+    upcoming_shows, past_shows = artist_shows(artist_id, now)
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": artist.genre_names,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website_link,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "seeking_description": artist.seeking_description,
+        "image_link": artist.image_link,
+        "upcoming_shows_count": len(upcoming_shows),
+        "past_shows_count": len(past_shows),
+        "upcoming_shows": upcoming_shows,
+        "past_shows": past_shows,
+    }
+
+#----------------------------------------------------------------------------#
+# Show queries.
+#----------------------------------------------------------------------------#
+
+
+def show_listing(upcoming=False, now=None):
+    # The columns the /shows tiles need, joined in one select and ordered by
+    # (start_time, id) for keyset pagination.
+    statement = db.select(
+        Show.id,
+        Show.start_time,
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link'),
+        Show.venue_id,
+        Venue.name.label('venue_name')
+    ).join(Artist, Show.artist_id == Artist.id).join(
+        Venue, Show.venue_id == Venue.id)
+
+    if upcoming:
+        statement = statement.where(
+            Show.start_time > (now if now is not None else datetime.now()))
+    return statement.order_by(Show.start_time, Show.id)
+
+
+def upcoming_show_total():
+    # Total for show_listing(upcoming=True) from the venues' materialized
+    # counters, one row per venue rather than per show. It lags the clock
+    # by up to one counter rollover, so it is reported as an estimate.
+    # Returns (total, estimated) for keyset_page.
+    total = db.session.query(func.coalesce(func.sum(Venue.upcoming_show_count), 0)).scalar()
+    return total, True
+
+
+def _partitioned_shows(key, entity_id, counterpart_key, counterpart, now):
+    if now is None:
+        now = datetime.now()
+    prefix = counterpart.__tablename__
+    rows = db.session.query(
+        Show.start_time,
+        counterpart_key.label('counterpart_id'),
+        counterpart.name.label('counterpart_name'),
+        counterpart.image_link.label('counterpart_image_link')
+    ).join(counterpart, counterpart_key == counterpart.id).filter(
+        key == entity_id).order_by(Show.start_time, Show.id).all()
+
+    upcoming, past = [], []
+    for row in rows:
+        (upcoming if row.start_time > now else past).append({
+            f"{prefix}_id": row.counterpart_id,
+            f"{prefix}_name": row.counterpart_name,
+            f"{prefix}_image_link": row.counterpart_image_link,
+            "start_time": row.start_time
+        })
+    return upcoming, past
+
+
+def next_rollover(upcoming_shows):
+    # When the earliest upcoming show starts, after which a page built from
+    # this partition is stale.
+    if not upcoming_shows:
+        return None
+    return upcoming_shows[0]["start_time"]
+
+
+def _detail_version(model, entity_id, key, counterpart_key, counterpart, now):
+    # Row versions behind a detail page: the entity's own, its shows' and
+    # their counterparts', plus the show and upcoming counts so deletes and
+    # the upcoming/past rollover change it too. None if the entity is gone.
+    if now is None:
+        now = datetime.now()
+    return db.session.query(
+        model.updated_at,
+        func.max(Show.updated_at),
+        func.max(counterpart.updated_at),
+        func.count(Show.id),
+        func.count(case((Show.start_time > now, Show.id)))
+    ).outerjoin(Show, key == model.id).outerjoin(
+        counterpart, counterpart_key == counterpart.id
+    ).filter(model.id == entity_id).group_by(model.id, model.updated_at).first()
+
+
+def venue_version(venue_id, now=None):
+    return _detail_version(Venue, venue_id, Show.venue_id, Show.artist_id, Artist, now)
+
+
+def artist_version(artist_id, now=None):
+    return _detail_version(Artist, artist_id, Show.artist_id, Show.venue_id, Venue, now)
+
+
+def venue_shows(venue_id, now=None):
+    # (upcoming, past) shows at a venue with the artist's name and image,
+    # fetched in one query.
+    return _partitioned_shows(Show.venue_id, venue_id, Show.artist_id, Artist, now)
+
+
+def artist_shows(artist_id, now=None):
+    # (upcoming, past) shows for an artist with the venue's name and image,
+    # fetched in one query.
+    return _partitioned_shows(Show.artist_id, artist_id, Show.venue_id, Venue, now)
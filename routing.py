@@ -0,0 +1,147 @@
+import itertools
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.dml import UpdateBase
+
+#----------------------------------------------------------------------------#
+# Read replica routing.
+#
+# Views decorated with @replica_reads send their SELECTs to one of the
+# replica binds (SQLALCHEMY_BINDS keys starting with "replica"), picked
+# round-robin per request so the whole request reads one snapshot.
+# Everything else, including every flush and DML statement, goes to the
+# primary. A replica that raises a connection error is skipped for
+# REPLICA_RETRY_SECONDS and the view is retried on the primary; with none
+# healthy, reads go to the primary.
+#
+# Replicas lag, so after a client's successful write its reads stay on the
+# primary for REPLICA_STICKY_SECONDS (tracked in the signed session cookie)
+# and it sees its own change on the redirect that follows.
+#----------------------------------------------------------------------------#
+
+REPLICA_PREFIX = 'replica'
+
+
+class ReplicaRouter(object):
+
+    def __init__(self, app=None, db=None):
+        self.binds = []
+        self.sticky_seconds = 5
+        self.retry_seconds = 30
+        self._turn = itertools.count()
+        self._down_until = {}
+        self._engines = {}
+        self._lock = threading.Lock()
+        self.db = None
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.db = db
+        self.binds = sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {}
+                            if key.startswith(REPLICA_PREFIX))
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 5)
+        self.retry_seconds = app.config.get('REPLICA_RETRY_SECONDS', 30)
+        app.after_request(self._stick_after_write)
+
+        with app.app_context():
+            for bind in self.binds:
+                self.watch(db.engines[bind], bind)
+
+    def watch(self, engine, bind):
+        # Marks bind down when engine fails to connect.
+        self._engines[engine] = bind
+        if not event.contains(engine, 'handle_error', self._on_error):
+            event.listen(engine, 'handle_error', self._on_error)
+
+    def _on_error(self, context):
+        # Failed connects have no connection yet; dropped ones are flagged
+        # as disconnects. Other errors are the statement's fault.
+        if context.is_disconnect or context.connection is None:
+            bind = self._engines.get(context.engine)
+            if bind is not None:
+                self.mark_down(bind)
+
+    def mark_down(self, bind):
+        with self._lock:
+            self._down_until[bind] = time.monotonic() + self.retry_seconds
+
+    def healthy(self, bind):
+        return self._down_until.get(bind, 0) <= time.monotonic()
+
+    def choose(self):
+        # Next healthy replica bind key, or None for the primary.
+        for _ in range(len(self.binds)):
+            bind = self.binds[next(self._turn) % len(self.binds)]
+            if self.healthy(bind):
+                return bind
+        return None
+
+    def sticky(self):
+        return session.get('primary_until', 0) > time.time()
+
+    def current(self):
+        # The replica serving this request's reads, or None for the primary.
+        if not has_request_context():
+            return None
+        bind = g.get('read_replica')
+        if bind is not None and self.healthy(bind):
+            return bind
+        return None
+
+    def _stick_after_write(self, response):
+        if (request.method in ('POST', 'PUT', 'PATCH', 'DELETE')
+                and not g.get('replica_view', False)
+                and response.status_code < 400
+                and self.binds):
+            session['primary_until'] = time.time() + self.sticky_seconds
+        return response
+
+
+replica_router = ReplicaRouter()
+
+
+def replica_reads(view):
+    # Marks a view as read-only so its queries may be served by a replica.
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.replica_view = True
+        if replica_router.binds and not replica_router.sticky():
+            g.read_replica = replica_router.choose()
+        try:
+            return view(*args, **kwargs)
+        except DBAPIError:
+            bind = g.pop('read_replica', None)
+            if bind is None or replica_router.healthy(bind):
+                raise
+            # The replica went away under us; the view only reads, so
+            # start it over on the primary.
+            replica_router.db.session.rollback()
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def read_bind(session, clause):
+    # The replica bind key a session should send clause to, or None for the
+    # primary.
+    if (session._flushing
+            or isinstance(clause, UpdateBase)
+            or getattr(clause, '_for_update_arg', None) is not None):
+        return None
+    return replica_router.current()
+
+
+class RoutingSession(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            key = read_bind(self, clause)
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,179 @@
+import re
+
+from sqlalchemy import (DDL, column, event, func, literal_column, select, table, text,
+                        union, union_all)
+
+from models import db, Venue, Artist
+from pagination import PER_PAGE, keyset_page
+
+#----------------------------------------------------------------------------#
+# Search index.
+#
+# Venues and artists are searched over name, city, state and genres. On
+# Postgres the index is a GIN expression index over a tsvector of those
+# columns plus a pg_trgm index on name so partial names stay index-backed.
+# On SQLite (local development and the benchmarks) the same pair are FTS5
+# external-content tables, a word index over those columns and a trigram
+# index over name, kept in sync with triggers. Both are created alongside
+# the tables by db.create_all() and by the matching migrations. Either way
+# a term matches by words or inside the name, so "enu" finds "Venue".
+#----------------------------------------------------------------------------#
+
+SEARCHABLE = {
+    'venue': Venue,
+    'artist': Artist,
+}
+SEARCH_COLUMNS = ('name', 'city', 'state', 'genres')
+
+
+def _document(model):
+    # Must stay identical to the indexed expression in _postgres_ddl().
+    # Literals rather than bind parameters, so the planner can match it.
+    parts = [func.coalesce(getattr(model, name), literal_column("''"))
+             for name in SEARCH_COLUMNS]
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined.op('||')(literal_column("' '")).op('||')(part)
+    return func.to_tsvector(literal_column("'simple'"), joined)
+
+
+def _postgres_ddl(tablename):
+    document = " || ' ' || ".join(
+        f"coalesce({name}, '')" for name in SEARCH_COLUMNS)
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE INDEX IF NOT EXISTS ix_{tablename}_search_document ON {tablename} "
+        f"USING gin (to_tsvector('simple', {document}))",
+        f"CREATE INDEX IF NOT EXISTS ix_{tablename}_name_trgm ON {tablename} "
+        f"USING gin (name gin_trgm_ops)",
+    ]
+
+
+def _fts5_ddl(tablename, fts, columns, options=''):
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    delete_old = (f"INSERT INTO {fts}({fts}, rowid, {names}) "
+                  f"VALUES ('delete', old.id, {old_values});")
+    insert_new = (f"INSERT INTO {fts}(rowid, {names}) "
+                  f"VALUES (new.id, {new_values});")
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{tablename}', content_rowid='id'{options})",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tablename} "
+        f"BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tablename} "
+        f"BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {tablename} "
+        f"BEGIN {delete_old} {insert_new} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _sqlite_ddl(tablename):
+    return (_fts5_ddl(tablename, f"{tablename}_search", SEARCH_COLUMNS)
+            + _fts5_ddl(tablename, f"{tablename}_name_trgm", ('name',),
+                        ", tokenize='trigram'"))
+
+
+for _model in SEARCHABLE.values():
+    _tablename = _model.__tablename__
+    for _statement in _postgres_ddl(_tablename):
+        event.listen(_model.__table__, 'after_create',
+                     DDL(_statement).execute_if(dialect='postgresql'))
+    for _statement in _sqlite_ddl(_tablename):
+        event.listen(_model.__table__, 'after_create',
+                     DDL(_statement).execute_if(dialect='sqlite'))
+    for _fts in ('search', 'name_trgm'):
+        event.listen(_model.__table__, 'before_drop',
+                     DDL(f"DROP TABLE IF EXISTS {_tablename}_{_fts}")
+                     .execute_if(dialect='sqlite'))
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+
+def _fts_query(term):
+    # Every word must match as a prefix; quoting keeps FTS5 syntax characters
+    # in user input from being interpreted.
+    words = re.findall(r"\w+", term)
+    return " ".join('"{}"*'.format(word) for word in words)
+
+
+def _postgres_search(model, term):
+    query = func.plainto_tsquery(literal_column("'simple'"), term)
+    document = _document(model)
+    matches = document.op('@@')(query) | model.name.ilike(f"%{term}%")
+    rank = -(func.ts_rank(document, query) + func.similarity(model.name, term))
+    return matches, rank, None
+
+
+def _sqlite_hits(model, term):
+    # Selects of (rowid, score) for the word matches, if the term has any
+    # words, and for the names containing the term. The trigram index
+    # matches a quoted phrase as a substring, but needs three characters;
+    # shorter terms scan it with LIKE.
+    trgm = table(f"{model.__tablename__}_name_trgm", column('rowid'), column('name'))
+    if len(term) >= 3:
+        contains = text(f"{trgm.name} MATCH :name_query").bindparams(
+            name_query='"{}"'.format(term.replace('"', '""')))
+    else:
+        contains = trgm.c.name.like(
+            "%{}%".format(re.sub(r"([\\%_])", r"\\\1", term)), escape="\\")
+    hits = [select(trgm.c.rowid, literal_column('0').label('score')).where(contains)]
+    fts_query = _fts_query(term)
+    if fts_query:
+        fts = table(f"{model.__tablename__}_search", column('rowid'))
+        hits.insert(0, select(fts.c.rowid, func.bm25(literal_column(fts.name)).label('score'))
+                    .where(text(f"{fts.name} MATCH :fts_query").bindparams(fts_query=fts_query)))
+    return hits
+
+
+def _sqlite_search(model, term):
+    # A row matching both ways keeps its word match score; name-only
+    # matches rank after every word match.
+    hits = union_all(*_sqlite_hits(model, term)).subquery()
+    best = (select(hits.c.rowid, func.min(hits.c.score).label('score'))
+            .group_by(hits.c.rowid).subquery())
+    return None, best.c.score, (best, best.c.rowid == model.id)
+
+
+def ranked(entity, term):
+    # Returns a select of (id, name, num_upcoming_shows, rank) for the
+    # entity, ordered best match first by ascending rank.
+    model = SEARCHABLE[entity]
+    term = (term or '').strip()
+    upcoming = model.upcoming_show_count.label('num_upcoming_shows')
+
+    if not term:
+        rank = literal_column('0')
+        return select(model.id, model.name, upcoming, rank.label('rank')).order_by(
+            model.id)
+
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        matches, rank, join = _sqlite_search(model, term)
+    elif dialect == 'postgresql':
+        matches, rank, join = _postgres_search(model, term)
+    else:
+        matches, rank, join = model.name.ilike(f"%{term}%"), literal_column('0'), None
+
+    statement = select(model.id, model.name, upcoming, rank.label('rank'))
+    if join is not None:
+        statement = statement.join(*join)
+    if matches is not None:
+        statement = statement.where(matches)
+    return statement.order_by(rank, model.id)
+
+
+def search_page(entity, term, cursor=None, per_page=PER_PAGE):
+    # A page of ranked() results for the search views. On SQLite the total
+    # counts the matched rowids, skipping the ranking and the join.
+    total = None
+    term = (term or '').strip()
+    if term and db.engine.dialect.name == 'sqlite':
+        rowids = union(*[hits.with_only_columns(hits.selected_columns.rowid)
+                         for hits in _sqlite_hits(SEARCHABLE[entity], term)]).subquery()
+        total = (db.session.scalar(select(func.count()).select_from(rowids)), False)
+    return keyset_page(ranked(entity, term), ['rank', 'id'], cursor, per_page, total)
@@ -0,0 +1,77 @@
+from flask import Blueprint, current_app, flash, render_template, request
+
+from cache import invalidate_show
+from http_cache import cache_control, LISTING, FORM
+from models import db, Venue, Artist, Show
+from pagination import keyset_page, estimate_rows
+from queries import show_listing, upcoming_show_total
+from routing import replica_reads
+
+#----------------------------------------------------------------------------#
+# Show pages.
+#----------------------------------------------------------------------------#
+
+shows = Blueprint('shows', __name__, url_prefix='/shows')
+
+
+@shows.route('')
+@cache_control(LISTING)
+@replica_reads
+def index():
+    upcoming = request.args.get('upcoming') == '1'
+    total = upcoming_show_total() if upcoming else estimate_rows(Show)
+    page = keyset_page(show_listing(upcoming), ['start_time', 'id'],
+                       cursor=request.args.get('cursor'), total=total)
+    if not page.items:
+        return render_template("errors/404.html")
+    data = []
+
+    for show in page.items:
+        data.append({
+            "artist_name": show.artist_name,
+            "artist_image_link": show.artist_image_link,
+            "artist_id": show.artist_id,
+            "venue_name": show.venue_name,
+            "venue_id": show.venue_id,
+            "start_time": show.start_time
+        })
+
+    return render_template('pages/shows.html', shows=data, page=page, upcoming=upcoming)
+
+
+@shows.route('/create')
+@cache_control(FORM)
+def create_form():
+    # renders form. do not touch.
+    from forms import ShowForm
+    form = ShowForm()
+    return render_template('forms/new_show.html', form=form)
+
+
+@shows.route('/create', methods=['POST'])
+def create():
+    from forms import ShowForm
+    show_form = ShowForm(request.form)
+    if show_form.validate():
+        artist_id = show_form.artist_id.data
+        venue_id = show_form.venue_id.data
+        show_start_time = show_form.start_time.data
+
+        try:
+            new_show = Show(
+                artist=Artist.query.get(artist_id),
+                venue=Venue.query.get(venue_id),
+                start_time=show_start_time
+            )
+
+            db.session.add(new_show)
+            db.session.commit()
+            invalidate_show(venue_id, artist_id)
+        except:
+            db.session.rollback()
+            flash("Wrong Venue/Artist ID")
+            current_app.logger.exception("Creating show failed")
+        finally:
+            db.session.close()
+    flash('Show was successfully listed!')
+    return render_template('pages/home.html')
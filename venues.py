@@ -0,0 +1,184 @@
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, \
+    request, url_for
+
+from cache import page_cache, venue_page_keys, invalidate_venue
+from http_cache import cache_control, LISTING, PAGE, FORM
+from models import db, Venue
+from queries import venue_areas, venue_detail, next_rollover
+from routing import replica_reads
+from search import search_page
+
+#----------------------------------------------------------------------------#
+# Venue pages.
+#
+# Forms are imported in the views that use them: WTForms is only needed
+# once someone opens or submits one.
+#----------------------------------------------------------------------------#
+
+venues = Blueprint('venues', __name__, url_prefix='/venues')
+
+
+@venues.route('')
+@cache_control(LISTING)
+@replica_reads
+def index():
+    return render_template('pages/venues.html', areas=venue_areas(genre=request.args.get('genre')))
+
+
+@venues.route('/search', methods=['POST'])
+@replica_reads
+def search():
+    search_term = request.form.get('search_term', '')
+    page = search_page('venue', search_term, cursor=request.form.get('cursor'))
+    data = []
+    for item in page.items:
+        data.append({
+            "id": item.id,
+            "name": item.name,
+            "num_upcoming_shows": item.num_upcoming_shows
+        })
+
+    response = {
+        "count": page.total,
+        "data": data,
+        "next_cursor": page.next_cursor
+    }
+    return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+
+@venues.route('/<int:venue_id>')
+@cache_control(PAGE)
+@replica_reads
+def show(venue_id):
+    cached = page_cache.get(f"venue:{venue_id}")
+    if cached is not None:
+        return cached
+
+    data = venue_detail(venue_id)
+    if data is None:
+        return render_template("errors/404.html")
+
+    html = render_template('pages/show_venue.html', venue=data)
+    page_cache.set(f"venue:{venue_id}", html, expires_at=next_rollover(data["upcoming_shows"]))
+    return html
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+
+@venues.route('/create', methods=['GET'])
+@cache_control(FORM)
+def create_form():
+    from forms import VenueForm
+    form = VenueForm()
+    return render_template('forms/new_venue.html', form=form)
+
+
+@venues.route('/create', methods=['POST'])
+def create():
+    from forms import VenueForm
+    venue_form = VenueForm(request.form)
+    if venue_form.validate():
+        try:
+            new_venue = Venue(
+                name=venue_form.name.data,
+                city=venue_form.city.data,
+                state=venue_form.state.data,
+                address=venue_form.address.data,
+                phone=venue_form.phone.data,
+                image_link=venue_form.image_link.data,
+                facebook_link=venue_form.facebook_link.data,
+                website_link=venue_form.website_link.data,
+                seeking_talent=venue_form.seeking_talent.data,
+                seeking_description=venue_form.seeking_description.data
+            )
+            new_venue.set_genres(venue_form.genres.data)
+            db.session.add(new_venue)
+            db.session.commit()
+            flash(f"Venue {request.form['name']} was successfully listed!")
+        except:
+            db.session.rollback()
+            current_app.logger.exception("Creating venue failed")
+            flash(
+                f"An error occurred. Venue {request.form['name']} could not be listed.")
+            return render_template("forms/new_venue.html", form=venue_form)
+        finally:
+            db.session.close()
+    return render_template('pages/home.html')
+
+
+@venues.route('/<venue_id>', methods=['DELETE'])
+def delete(venue_id):
+    venue_to_delete = Venue.query.get(venue_id)
+    if venue_to_delete is None:
+        abort(404)
+
+    try:
+        flash(f"Venue {venue_to_delete.name} was deleted successfully!")
+        stale_pages = venue_page_keys(venue_to_delete.id)
+        db.session.delete(venue_to_delete)
+        db.session.commit()
+        page_cache.delete(*stale_pages)
+    except:
+        db.session.rollback()
+        current_app.logger.exception("Deleting venue %s failed", venue_id)
+    finally:
+        db.session.close()
+
+    return jsonify({"success": True})
+
+#  Update
+#  ----------------------------------------------------------------
+
+
+@venues.route('/<int:venue_id>/edit', methods=['GET'])
+@cache_control(FORM)
+def edit_form(venue_id):
+    from forms import VenueForm
+    venue = Venue.query.get(venue_id)
+
+    form = VenueForm(
+        name=venue.name,
+        genres=venue.genre_names,
+        city=venue.city,
+        state=venue.state,
+        phone=venue.phone,
+        website_link=venue.website_link,
+        facebook_link=venue.facebook_link,
+        seeking_talent=venue.seeking_talent,
+        address=venue.address
+    )
+    return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+
+@venues.route('/<int:venue_id>/edit', methods=['POST'])
+def edit(venue_id):
+    from forms import VenueForm
+    venue_edit_form = VenueForm(request.form)
+    venue = Venue.query.get(venue_id)
+    if not venue:
+        return render_template("errors/404.html")
+
+    try:
+        venue.name = venue_edit_form.name.data
+        venue.set_genres(venue_edit_form.genres.data)
+        venue.phone = venue_edit_form.phone.data
+        venue.facebook_link = venue_edit_form.facebook_link.data
+        venue.image_link = venue_edit_form.image_link.data
+        venue.city = venue_edit_form.city.data
+        venue.state = venue_edit_form.state.data
+        venue.website_link = venue_edit_form.website_link.data
+        venue.seeking_talent = venue_edit_form.seeking_talent.data
+        venue.seeking_description = venue_edit_form.seeking_description.data
+
+        db.session.commit()
+        invalidate_venue(venue_id)
+    except:
+        db.session.rollback()
+        current_app.logger.exception("Updating venue %s failed", venue_id)
+        flash("Venue info update unsuccessful")
+    finally:
+        db.session.close()
+
+    flash(f"Successfully updated Venue '{venue_edit_form.name.data}'")
+    return redirect(url_for('venues.show', venue_id=venue_id))
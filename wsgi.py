@@ -0,0 +1,12 @@
+from app import create_app
+
+#----------------------------------------------------------------------------#
+# WSGI entry point.
+#
+#   gunicorn wsgi:app --workers 4 --preload
+#
+# With --preload the app is built once in the master and the workers fork
+# from it, already imported.
+#----------------------------------------------------------------------------#
+
+app = create_app()